@@ -1,19 +1,106 @@
+import json
+import marshal
+import numpy as np
 import re
 from collections import OrderedDict
+from itertools import chain
+
+from LayoutBoxes import LayoutBoxes
+from LayoutRules import MONETARY_REPORT_RULE
+
+
+ANALYZER_VERSION = 2
+TREE_HEADER = b"IDXT" + bytes([1, marshal.version])
+
+CHINESE_PATTERN = re.compile("[\u4e00-\u9fa5]")
+
+# x0与正文x0众数之差小于该值的行视为正文行，其余为缩进不同、开始新段落的行
+X0_TOLERANCE = 5
 
 
 class IndexNode:
-    def __init__(self):
-        self.title = ""
-        self.paragraphs = []
+    __slots__ = ("title", "paragraphs", "children", "parent", "page")
+
+    def __init__(self, title="", paragraphs=None, children=None, page=0):
+        """
+        目录树节点，parent由父节点添加子节点时设置，根节点的parent为None
+        :param title: str，标题
+        :param paragraphs: List[str]，标题下的段落
+        :param children: List[IndexNode]，子标题
+        :param page: int，标题所在页码
+        """
+        self.title = title
+        self.paragraphs = paragraphs if paragraphs is not None else []
         self.children = []
-        self.parent = "root"
-        self.page = 0
+        self.parent = None
+        self.page = page
+
+        for child in children or []:
+            self.add_child(child)
+
+    def add_child(self, node):
+        self.children.append(node)
+        node.parent = self
+
+    def to_dict(self):
+        """
+        :return: dict，{"title", "page", "paragraphs", "children"}，不包含parent
+        """
+        return {"title": self.title, "page": self.page, "paragraphs": list(self.paragraphs),
+                "children": [child.to_dict() for child in self.children]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        :param data: dict，to_dict的结果
+        :return: IndexNode
+        """
+        return cls(data["title"], list(data["paragraphs"]), [cls.from_dict(child) for child in data["children"]],
+                   data["page"])
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def to_bytes(self):
+        """
+        紧凑的二进制格式：文件头 + marshal编码的嵌套元组(title, page, paragraphs, children)，
+        只能由marshal版本相同的Python读取
+        :return: bytes
+        """
+        return TREE_HEADER + marshal.dumps(self._to_tuple())
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        :param data: bytes，to_bytes的结果
+        :return: IndexNode
+        """
+        if data[:len(TREE_HEADER)] != TREE_HEADER:
+            raise ValueError("not an index tree, or written by an incompatible version")
+
+        return cls._from_tuple(marshal.loads(memoryview(data)[len(TREE_HEADER):]))
+
+    def _to_tuple(self):
+        return self.title, self.page, tuple(self.paragraphs), tuple(child._to_tuple() for child in self.children)
+
+    @classmethod
+    def _from_tuple(cls, data):
+        (title, page, paragraphs, children) = data
+
+        return cls(title, list(paragraphs), [cls._from_tuple(child) for child in children], page)
 
 
 class MonetaryPolicyReportAnalyzer:
-    def __init__(self):
-        self.pages = OrderedDict()
+    def __init__(self, rule=MONETARY_REPORT_RULE):
+        """
+        :param rule: LayoutRule，标题与非正文块的版面规则
+        """
+        self.rule = rule
+        self.boxes = LayoutBoxes()
         self.index_tree = IndexNode()
         self.most_height = 0
         self.most_x0 = 0
@@ -21,52 +108,24 @@ class MonetaryPolicyReportAnalyzer:
         self.pdf_name = ""
 
     def analyze(self, parse_result):
-        self.pages = self.divide_to_pages(parse_result)
-        self.pdf_name = self.get_pdf_name(self.pages)
-        self.most_height = self.get_most_height(self.pages)
-        self.pages = self.delete_non_text_part(self.pages)
-        self.most_x0 = self.get_most_x0(self.pages)
-        self.pages = self.merge_continuous_paragraph(self.pages)
-        plain_text = self.concat_pages_to_plain_text(self.pages)
-        self.index_tree = self.convert_to_tree(plain_text)
+        pages_dict = self.divide_to_pages(parse_result)
+        self.pdf_name = self.get_pdf_name(pages_dict)
+        # 分页后只建立一次列式存储，之后各阶段都在其上计算
+        self.boxes = LayoutBoxes.from_pages(pages_dict)
+        self.most_height = self.get_most_height(self.boxes)
+        self.boxes = self.delete_non_text_part(self.boxes)
+        self.most_x0 = self.get_most_x0(self.boxes)
+        self.boxes = self.merge_continuous_paragraph(self.boxes)
+        paragraphs = self.concat_pages_to_plain_text(self.boxes)
+        self.index_tree = self.convert_to_tree(paragraphs)
 
         return self.index_tree
 
-    def get_most_height(self, pages_dict):
-        contents = []
-        for value in pages_dict.values():
-            contents += value
-
-        heights = [item[1] for item in contents]
-        freq_dict = {}
-
-        for height in heights:
-            freq_dict[height] = freq_dict.setdefault(height, 0) + 1
-
-        heights = [(k, v) for k, v in freq_dict.items()]
-        heights.sort(key=lambda x: x[1])
-
-        most_height = heights[-1][0]
-
-        return most_height
-
-    def get_most_x0(self, pages_dict):
-        contents = []
-        for value in pages_dict.values():
-            contents += value
-
-        x0s = [item[0] for item in contents]
-        freq_dict = {}
-
-        for x0 in x0s:
-            freq_dict[x0] = freq_dict.setdefault(x0, 0) + 1
+    def get_most_height(self, boxes):
+        return boxes.mode("height")
 
-        x0s = [(k, v) for k, v in freq_dict.items()]
-        x0s.sort(key=lambda x: x[1])
-
-        most_x0 = x0s[-1][0]
-
-        return most_x0
+    def get_most_x0(self, boxes):
+        return boxes.mode("x0")
 
     def get_pdf_name(self, pages_dict):
         first_path_content = pages_dict['O']
@@ -75,13 +134,12 @@ class MonetaryPolicyReportAnalyzer:
         return pdf_name
 
     def divide_to_pages(self, parse_result):
+        # parse_result可以是逐页产出文本框的迭代器，边解析边分页，不复制整份解析结果
         cache = []
         in_page = False
         pages_dict = OrderedDict()
-        parse_result = parse_result + [(0, 0, '')]
 
-        for ind in range(len(parse_result)):
-            line = parse_result[ind]
+        for line in chain(parse_result, [(0, 0, '')]):
             content = line[-1]
 
             if content.strip() == "":
@@ -110,214 +168,117 @@ class MonetaryPolicyReportAnalyzer:
 
         return pages_dict
 
-    def delete_non_text_part(self, pages_dict):
-        in_table, match_table_ending, in_figure, in_column = False, False, False, False
+    def delete_non_text_part(self, boxes):
+        # block为None时在正文中，否则为所在的非正文块
+        block, match_ending = None, False
+        last_page = None
+        text_height = min(14, self.most_height)
+        keep = np.ones(len(boxes), dtype=bool)
+        heights = boxes.height.tolist()
 
-        for page_index, pages_content in pages_dict.items():
+        for (page_index, start, stop) in boxes.page_ranges():
             if not page_index.isnumeric():
                 continue
 
-            tables, figures, columns = [], [], []
-
-            for ind in range(len(pages_content)):
-                line = pages_content[ind]
-                (_, height, content) = line
-
-                if not (in_table or in_figure or in_column):
-                    if re.match('专栏 \\d+ ', content):
-                        in_column = True
-                        columns.append(ind)
+            # 表格、图、专栏不会跨越不连续的页面（如只解析了部分页面时）
+            if page_index.isdigit():
+                if last_page is not None and int(page_index) != last_page + 1:
+                    block, match_ending = None, False
+                last_page = int(page_index)
 
-                    elif re.match('表 \\d+ ', content):
-                        in_table = True
-                        tables.append(ind)
-                        match_table_ending = False
-
-                    elif re.match('数据来源：[^。]+?。', content):
-                        figures.append(ind)
-
-                        if not re.match('.+?图 \\d+ ', content):
-                            in_figure = True
-                    continue
+            for ind in range(start, stop):
+                height, content = heights[ind], boxes.content[ind]
 
-                if in_column:
-                    if height > min(14, self.most_height) and self.check_chinese(content) and "数据来源" not in content:
-                        in_column = False
-
-                        if not (in_table or in_figure or in_column):
-                            if re.match('专栏 \\d+ ', content):
-                                in_column = True
-                                columns.append(ind)
-
-                            elif re.match('表 \\d+ ', content):
-                                in_table = True
-                                tables.append(ind)
-                                match_table_ending = False
-
-                            elif re.match('数据来源：[^。]+?。', content):
-                                figures.append(ind)
-
-                                if not re.match('.+?图 \\d+ ', content):
-                                    in_figure = True
-
-                    else:
-                        columns.append(ind)
-                    continue
-
-                if in_table:
-                    if re.match('.*?数据来源：[^。]+?。', content):
-                        match_table_ending = True
-                        tables.append(ind)
+                if block is not None:
+                    if block.marker is not None and block.marker.match(content):
+                        match_ending = True
+                        keep[ind] = False
                         continue
 
-                    if match_table_ending and height > min(14, self.most_height) and self.check_chinese(content):
-                        in_table = False
-
-                        if not (in_table or in_figure or in_column):
-                            if re.match('专栏 \\d+ ', content):
-                                in_column = True
-                                columns.append(ind)
-
-                            elif re.match('表 \\d+ ', content):
-                                in_table = True
-                                tables.append(ind)
-                                match_table_ending = False
-
-                            elif re.match('数据来源：[^。]+?。', content):
-                                figures.append(ind)
-
-                                if not re.match('.+?图 \\d+ ', content):
-                                    in_figure = True
-
-                    else:
-                        if re.match('表 \\d+ {1,2}', content):
-                            match_table_ending = False
-                        tables.append(ind)
-                    continue
+                    if block.end is not None and block.end.match(content):
+                        keep[ind] = False
 
-                if in_figure:
-                    if re.match('图 \\d+ {1,2}', content):
-                        in_figure = False
-
-                        if not (in_table or in_figure or in_column):
-                            if re.match('专栏 \\d+ ', content):
-                                in_column = True
-                                columns.append(ind)
-
-                            elif re.match('表 \\d+ ', content):
-                                in_table = True
-                                tables.append(ind)
-                                match_table_ending = False
-
-                            elif re.match('数据来源：[^。]+?。', content):
-                                figures.append(ind)
+                    elif not (block.end_on_text and (match_ending or block.marker is None)
+                              and height > text_height and self.check_chinese(content)
+                              and not (block.not_text is not None and block.not_text.search(content))):
+                        if block.marker is not None and block.start.match(content):
+                            match_ending = False
+                        keep[ind] = False
+                        continue
 
-                                if not re.match('.+?图 \\d+ ', content):
-                                    in_figure = True
+                    block = None
 
-                    figures.append(ind)
-                    continue
+                # 正文中遇到非正文块的开头
+                start_block = self.rule.match_block(content)
+                if start_block is not None:
+                    keep[ind] = False
 
-            cache = [item for item in pages_content if pages_content.index(item) not in (tables + figures + columns)]
-            pages_dict[page_index] = cache
+                    if not (start_block.single_line is not None and start_block.single_line.match(content)):
+                        block, match_ending = start_block, False
 
-        return pages_dict
+        return boxes.select(keep)
 
     def check_chinese(self, text):
-        if re.search("[\u4e00-\u9fa5]", text):
+        if CHINESE_PATTERN.search(text):
             return True
 
         return False
 
-    def merge_continuous_paragraph(self, pages_dict):
-        for page_index, page_content in pages_dict.items():
-            if not page_index.isnumeric() or not page_content:
-                continue
-
-            cache_page_content = []
-            cache_content = ""
-            cache_height = []
-            cache_x0 = 0
-
-            for ind in range(len(page_content)):
-                (x0, height, content) = page_content[ind]
-
-                if abs(x0 - self.most_x0) >= 5:
-                    if cache_content:
-                        cache_mean_height = sum(cache_height) / len(cache_height)
-                        cache_page_content.append((cache_x0, cache_mean_height, cache_content))
-
-                        cache_content = ""
-                        cache_height = []
-
-                    cache_content += content
-                    cache_height.append(height)
-                    cache_x0 = x0
-                else:
-                    cache_content += content
-                    cache_height.append(height)
+    def merge_continuous_paragraph(self, boxes):
+        # 正文页中缩进不同的行开始新的一行，其余行并入上一行；每页的第一行和非正文页的行各自独立
+        starts = ~boxes.within("x0", self.most_x0, X0_TOLERANCE)
 
-                    if ind == 0:
-                        cache_x0 = x0
+        for (page_index, start, stop) in boxes.page_ranges():
+            if not page_index.isnumeric():
+                starts[start: stop] = True
+            elif start < stop:
+                starts[start] = True
 
-            cache_mean_height = sum(cache_height) / len(cache_height)
-            cache_page_content.append((cache_x0, cache_mean_height, cache_content))
+        return boxes.merge(starts)
 
-            pages_dict[page_index] = cache_page_content
+    def concat_pages_to_plain_text(self, boxes):
+        x0s, heights, page_ids, contents = [], [], [], []
+        last_page = None
+        x0_list, height_list = boxes.x0.tolist(), boxes.height.tolist()
+        indented = (~boxes.within("x0", self.most_x0, X0_TOLERANCE)).tolist()
 
-        return pages_dict
+        for (page_id, (page_index, start, stop)) in enumerate(boxes.page_ranges()):
+            if not page_index.isnumeric() or start == stop:
+                continue
 
-    def concat_pages_to_plain_text(self, pages_dict):
-        plain_text = []
+            # 段落不会跨越不连续的页面
+            is_continuous = True
+            if page_index.isdigit():
+                is_continuous = last_page is None or int(page_index) == last_page + 1
+                last_page = int(page_index)
 
-        for page_index, page_content in pages_dict.items():
-            if not page_index.isnumeric() or not page_content:
-                continue
+            for ind in range(start, stop):
+                x0, height, content = x0_list[ind], height_list[ind], boxes.content[ind]
 
-            for (x0, height, content) in page_content:
-                if abs(x0 - self.most_x0) >= 5:
-                    plain_text.append([page_index, x0, height, content])
+                if indented[ind] or (ind == start and not is_continuous):
+                    x0s.append(x0)
+                    heights.append(height)
+                    page_ids.append(page_id)
+                    contents.append(content)
                 else:
-                    plain_text[-1][2] = (plain_text[-1][1] + height) / 2
-                    plain_text[-1][3] += content
+                    heights[-1] = (heights[-1] + height) / 2
+                    contents[-1] += content
 
-        return plain_text
+        return LayoutBoxes(x0s, heights, page_ids, contents, boxes.page_labels)
 
     def get_index_token(self, text):
-        pattern = re.compile('第[一二三四五六七八九十]{1,2}部分')
-        result = re.match(pattern, text)
-        if result:
-            return 'A'
-
-        pattern = re.compile('([一二三四五六七八九十]{1,2})([.、])')
-        result = re.match(pattern, text)
-        if result:
-            return 'B'
-
-        pattern = re.compile('[（(][一二三四五六七八九十0-9]{1,2}[)）]')
-        result = re.match(pattern, text)
-        if result:
-            return 'C'
-
-        pattern = re.compile('([0-9]{1,2})([.、])')
-        result = re.match(pattern, text)
-        if result:
-            return 'D'
-
-        return None
-
-    def convert_to_tree(self, plain_text):
-        root_node = IndexNode()
-        root_node.title = self.pdf_name
+        return self.rule.match_heading(text)
+
+    def convert_to_tree(self, paragraphs):
+        root_node = IndexNode(self.pdf_name)
         parent_stack = [('root', root_node)]
 
-        for (page_index, x0s, height, content) in plain_text:
+        for (page_id, content) in zip(paragraphs.page_id.tolist(), paragraphs.content):
+            page_index = paragraphs.page_labels[page_id]
             index_token = self.get_index_token(content.replace(" ", ""))
 
             if len(content) <= self.title_max_length and index_token is not None:
-                new_node = IndexNode()
-                new_node.page = page_index
-                new_node.title = content
+                new_node = IndexNode(content, page=int(page_index) if page_index.isdigit() else 0)
                 is_added = False
 
                 # 与上一标题行平级
@@ -326,15 +287,13 @@ class MonetaryPolicyReportAnalyzer:
                     if parent_stack[ind][0] == index_token:
                         while len(parent_stack) > ind:
                             parent_stack.pop()
-                        parent_stack[-1][1].children.append(new_node)
-                        new_node.parent = parent_stack[-1][1]
+                        parent_stack[-1][1].add_child(new_node)
                         parent_stack.append((index_token, new_node))
                         is_added = True
                         break
 
                 if not is_added:
-                    parent_stack[-1][1].children.append(new_node)
-                    new_node.parent = parent_stack[-1][1]
+                    parent_stack[-1][1].add_child(new_node)
                     parent_stack.append((index_token, new_node))
 
             else:
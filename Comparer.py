@@ -1,7 +1,60 @@
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from CSS import get_css
+from KeywordAutomaton import KeywordAutomaton
 from PDFParser import PDFParser
-from alignment_methods import align_text
+from TreeIndex import TreeIndex
+from alignment_methods import align_text, diff_text, SEGMENT_CACHE
+
+
+# 货币政策执行报告的对比项：(一级名称, 二级名称, 对比方式, 路径列表, 关键词)
+MONETARY_REPORT_SPEC = [
+    ("项目", "", "title", [[["t"]]], None),
+
+    ("总体基调", "", "continuous", [[["c5"], ["c1"], ["p2"]]], None),
+
+    ("货币政策展望", "流动性", "discrete", [[["c5"], ["c2"], ["ps1", "p1s-1"]]], ["稳健的货币政策", "大水漫灌", "货币政策稳定性"]),
+    ("货币政策展望", "风险防控", "discrete", [[["c5"], ["c2"], ["ps1"]]], ["金融风险"]),
+    ("货币政策展望", "房地产", "discrete", [[["c5"], ["c2"], ["ps-1"]]], ["房子"]),
+    ("货币政策展望", "信贷总量", "discrete", [[["c5"], ["c2"], ["p3"]]], ["再贷款", "再贴现", "信贷", "工具", "总闸门"]),
+    ("货币政策展望", "信贷结构", "discrete", [[["c5"], ["c2"], ["p4"]]], ["再贷款", "再贴现", "信贷", "工具", "总闸门"]),
+    ("货币政策展望", "汇率", "discrete", [[["c5"], ["c2"], ["ps1"]]], ["汇率"]),
+
+    ("货币政策回顾", "流动性", "discrete", [[["c1"], ["c"], ["t"]]], ["流动性"]),
+    ("货币政策回顾", "政策工具", "discrete", [[["c2"], ["c"], ["t"]]], ["操作", "便利", "货币信贷", "准备金率"]),
+    ("货币政策回顾", "宏观审慎", "discrete", [[["c2"], ["c"], ["t"]]], ["宏观审慎"]),
+    ("货币政策回顾", "信贷", "discrete", [[["c2"], ["c"], ["t"]]], ["信贷政策"]),
+    ("货币政策回顾", "汇率", "discrete", [[["c1"], ["c"], ["t"]], [["c2"], ["c"], ["p1s1"]]], ["汇率"]),
+    ("货币政策回顾", "本外币存贷款", "discrete", [[["c1"], ["c2"], ["t"]]], ["贷款", "存款"]),
+    ("货币政策回顾", "社融", "discrete", [[["c1"], ["c"], ["t"]]], ["社会融资"]),
+    ("货币政策回顾", "风险处置", "discrete", [[["c2"], ["c"], ["t"]]], ["金融风险"]),
+
+    ("世界经济形势", "经济增速", "discrete", [[["c4"], ["c1"], ["c1"], ["p1s1"]]], None),
+
+    ("国内经济形势", "经济增速", "discrete", [[["c4"], ["c2"], ["p1s1"]], [["c4"], ["c1"], ["p1s1", "p2s1", "p3s1"]]], None),
+    ("国内经济形势", "消费", "discrete", [[["c4"], ["c2"], ["c1"], ["p1s1"]]], None),
+    ("国内经济形势", "投资", "discrete", [[["c4"], ["c2"], ["c1"], ["p2s1"]]], None),
+    ("国内经济形势", "进出口", "discrete", [[["c4"], ["c2"], ["c1"], ["p3s1"]]], None),
+    ("国内经济形势", "农业", "discrete", [[["c4"], ["c2"], ["c2"], ["p2s1"]]], None),
+    ("国内经济形势", "工业", "discrete", [[["c4"], ["c2"], ["c2"], ["p3s1"]]], None),
+    ("国内经济形势", "服务业", "discrete", [[["c4"], ["c2"], ["c2"], ["p4s1"]]], None),
+    ("国内经济形势", "财政与就业", "discrete", [[["c4"], ["c2"], ["c4"], ["t"]]], None),
+
+    ("价格形势", "总体趋势", "discrete", [[["c5"], ["c1"], ["p4s1"]]], None),
+    ("价格形势", "CPI", "discrete", [[["c4"], ["c2"], ["c3"], ["p1s1"]]], None),
+    ("价格形势", "PPI", "discrete", [[["c4"], ["c2"], ["c3"], ["p2s1"]]], None),
+
+    ("金融市场运行回顾", "货币市场", "discrete", [[["c3"], ["c1"], ["c1"], ["t"]]], None),
+    ("金融市场运行回顾", "债券市场", "discrete", [[["c3"], ["c1"], ["c2"], ["t"]]], None),
+    ("金融市场运行回顾", "票据市场", "discrete", [[["c3"], ["c1"], ["c3"], ["t"]]], None),
+    ("金融市场运行回顾", "股票市场", "discrete", [[["c3"], ["c1"], ["c4"], ["t"]]], None),
+    ("金融市场运行回顾", "保险市场", "discrete", [[["c3"], ["c1"], ["c5"], ["t"]]], None),
+    ("金融市场运行回顾", "外汇市场", "discrete", [[["c3"], ["c1"], ["c6"], ["t"]]], None),
+    ("金融市场运行回顾", "黄金市场", "discrete", [[["c3"], ["c1"], ["c7"], ["t"]]], None),
+]
+
+MONETARY_REPORT_KEYWORDS = KeywordAutomaton(kw for (_, _, _, _, keywords) in MONETARY_REPORT_SPEC for kw in keywords or [])
 
 
 class ReportComparer:
@@ -24,7 +77,8 @@ class ReportComparer:
 
     def compare_report(self, new_report, old_report, **kwargs):
         """
-        报告对比，根据rule自动调用不同的对比模块，传入参数根据rule有所变化，具体参考各实际调用接口
+        报告对比，根据rule自动调用不同的对比模块，传入参数根据rule有所变化，具体参考各实际调用接口；
+        两类报告都支持tokenizer参数，选择句内对比的切词方式
         :param new_report: str，新报告
         :param old_report: str，旧报告
         :param kwargs: dict，额外参数
@@ -32,35 +86,58 @@ class ReportComparer:
         """
         return self.comparer.compare_report(new_report, old_report, **kwargs)
 
-    def compare_text(self, new_text, old_text):
+    def compare_batch(self, reports, pairs="consecutive", **kwargs):
+        """
+        批量对比报告，每份报告只解析一次，目前只支持Monetary Report，参数参考MonetaryReportComparer.compare_batch
+        :param reports: List[str]，报告路径
+        :param pairs: Union[str, List[Tuple[str, str]]]，对比方式
+        :param kwargs: dict，额外参数
+        :return: List[Union[str, List[Tuple[str, str, str, str]]]]
+        """
+        if not isinstance(self.comparer, MonetaryReportComparer):
+            raise ValueError("compare_batch only supports rule 'Monetary Report', got %r" % self.rule)
+
+        return self.comparer.compare_batch(reports, pairs, **kwargs)
+
+    def compare_text(self, new_text, old_text, tokenizer="jieba"):
         """
         对比两个字符串
         :param new_text: str，新的文本
         :param old_text: str，旧的文本
+        :param tokenizer: Union[str, Callable[[str], List[str]]]，句内对比的切词方式，参考alignment_methods.diff_text
         :return: Tuple[List[str], List[str]]，对比结果，按照句号进行划分，以优化显示效果
         """
-        return self.comparer.compare_text(new_text, old_text)
+        return self.comparer.compare_text(new_text, old_text, tokenizer=tokenizer)
 
 
 class MonetaryCommitteeComparer:
     def __init__(self):
         self.tagging_result = []
         self.project_name = []
+        self.tokenizer = "jieba"
 
     def compare_report(self, new_report, old_report, **kwargs):
         """
         对比货币政策委员会例会记录
         :param new_report: List[str]，新报告，按段分割
         :param old_report: List[str]，旧报告，按段分割
-        :param kwargs: dict，占位参数，目前包含4个可用参数；
+        :param kwargs: dict，占位参数，目前包含6个可用参数；
                         to_html：bool, True时，输出html文件路径，反之输出对比结果列表；
                         output_path：str, 当to_html=True时，指定文件保存路径，默认为"./result.html"；
                         new_report_name：str，新报告的名称，如不提供则从报告第一段抽取；
                         old_report_name：str，旧报告的名称，如不提供则从报告第一段抽取；
+                        tokenizer：Union[str, Callable[[str], List[str]]]，句内对比的切词方式，默认为"jieba"，
+                                   参考alignment_methods.diff_text；
+                        segment_cache：str，分词缓存文件路径，对比前读取、对比后写回，多次运行之间复用分词结果；
         :return: List[Tuple[str, List[str], List[str]]]，对比结果每个Tuple是一行对比结果，Tuple中的str
                   是该行的行名，List[str]是新旧报告在该行的对比结果
         """
         self._load_report(new_report, old_report, **kwargs)
+        self.tokenizer = kwargs.get("tokenizer", "jieba")
+        segment_cache = kwargs.get("segment_cache")
+
+        if segment_cache is not None:
+            SEGMENT_CACHE.load(segment_cache)
 
         if not kwargs.get("to_html", False):
             comparison_result = [("项目", self.project_name[0], self.project_name[1])]
@@ -125,22 +202,30 @@ class MonetaryCommitteeComparer:
             comparison = self.compare_text("。".join(new_text), "。".join(old_text))
             comparison_result.append(("总体要求", comparison[0], comparison[1]))
 
+            if segment_cache is not None:
+                SEGMENT_CACHE.save(segment_cache)
+
             return comparison_result
 
         else:
             self._to_html(kwargs.get("output_path", "./result.html"))
 
+            if segment_cache is not None:
+                SEGMENT_CACHE.save(segment_cache)
+
             return kwargs.get("output_path", "./result.html")
 
-    def compare_text(self, new_text, old_text, join=False):
+    def compare_text(self, new_text, old_text, join=False, tokenizer=None):
         """
         对比两个字符串
         :param new_text: str，新的文本
         :param old_text: str，旧的文本
         :param join: bool
+        :param tokenizer: Union[str, Callable[[str], List[str]]]，句内对比的切词方式，char与ngram不需要加载jieba词典；
+                          为None时使用compare_report的tokenizer参数
         :return: Tuple[List[str], List[str]]，对比结果，按照句号进行划分，以优化显示效果
         """
-        new_result, old_result = align_text(new_text, old_text, join=join)
+        new_result, old_result = align_text(new_text, old_text, join=join, tokenizer=tokenizer or self.tokenizer)
 
         return new_result, old_result
 
@@ -403,441 +488,234 @@ class MonetaryCommitteeComparer:
 
 
 class MonetaryReportComparer:
-    def __init__(self):
+    def __init__(self, align_workers=1):
+        """
+        :param align_workers: Union[int, None]，对齐各对比项的进程数，不大于1时在当前进程中依次对齐，None为CPU核数
+        """
         self.report = []
+        self.indexes = {}
+        self.align_workers = _check_align_workers(align_workers)
+        self.tokenizer = "jieba"
+        self.segment_cache = None
 
     def compare_report(self, new_report, old_report, **kwargs):
         """
         对比货币政策执行报告
-        :param new_report: str, 新报告的路径
-        :param old_report: str, 旧报告的路径
-        :param kwargs: 占位参数，目前包含2个可用参数；
+        :param new_report: Union[str, bytes, BinaryIO, mmap.mmap], 新报告的路径、内容、文件对象或mmap
+        :param old_report: Union[str, bytes, BinaryIO, mmap.mmap], 旧报告的路径、内容、文件对象或mmap
+        :param kwargs: 占位参数，目前包含7个可用参数；
                         to_html：bool, True时，输出html文件路径，反之输出对比结果列表；
-                        output_path：str, 当to_html=True时，指定文件保存路径，默认为"./result.html"
+                        output_path：str, 当to_html=True时，指定文件保存路径，默认为"./result.html"；
+                        cache：ReportCache，磁盘缓存，命中时跳过pdf解析与分析；
+                        concurrent：bool，默认为True，在两个进程中同时解析新旧报告；
+                        align_workers：Union[int, None]，对齐各对比项的进程数，默认为构造时的值；
+                                       不大于1时在当前进程中依次对齐，大于1或为None（CPU核数）时在进程池中并行对齐，
+                                       结果与依次对齐相同；
+                        tokenizer：Union[str, Callable[[str], List[str]]]，句内对比的切词方式，默认为"jieba"，
+                                   参考alignment_methods.diff_text；
+                        segment_cache：str，分词缓存文件路径，对比前读取、对比后写回，多次运行之间复用分词结果；
+                                       并行对齐时子进程同样读取，新的分词结果交回当前进程后写回
         :return: Union[str, List[Tuple[str, str, str, str]]],
                  当to_html=True时，输出html文件路径；反之，输出对比结果列表
         """
         self._load_report(new_report, old_report, **kwargs)
+        self.align_workers = _check_align_workers(kwargs.get("align_workers", self.align_workers))
+        self.tokenizer = kwargs.get("tokenizer", "jieba")
+        self.segment_cache = kwargs.get("segment_cache")
+
+        if self.segment_cache is not None:
+            SEGMENT_CACHE.load(self.segment_cache)
 
         if kwargs.get("to_html", False):
             self._to_html(kwargs.get("output_path", "./result.html"))
-            return kwargs.get("output_path", "./result.html")
+            result = kwargs.get("output_path", "./result.html")
 
         else:
-            return self._to_stdout()
+            result = self._to_stdout()
+
+        if self.segment_cache is not None:
+            SEGMENT_CACHE.save(self.segment_cache)
+
+        return result
+
+    def compare_batch(self, reports, pairs="consecutive", **kwargs):
+        """
+        批量对比货币政策执行报告：每份报告只解析、分析一次，所有对比在同一个进程池中完成
+        :param reports: List[str]，报告路径，按时间先后排列
+        :param pairs: Union[str, List[Tuple[str, str]]]，"consecutive"--相邻两期报告依次对比；
+                      或(新报告路径, 旧报告路径)的列表
+        :param kwargs: 占位参数，目前包含7个可用参数；
+                        to_html：bool, True时，输出html文件路径，反之输出对比结果列表；
+                        output_dir：str，当to_html=True时，指定文件保存目录，文件名为"旧报告名_新报告名.html"，默认为"./"；
+                        passwords：Dict[str, str]，报告路径到pdf密码的映射；
+                        cache：ReportCache，磁盘缓存；
+                        workers：int，进程数，默认为CPU核数；
+                        tokenizer：str，句内对比的切词方式，默认为"jieba"，参考alignment_methods.diff_text；
+                        segment_cache：str，分词缓存文件路径，各进程对比前读取、对比后写回（后写入的覆盖先写入的）
+        :return: List[Union[str, List[Tuple[str, str, str, str]]]]，与pairs一一对应的对比结果
+        """
+        if pairs == "consecutive":
+            pairs = [(reports[i + 1], reports[i]) for i in range(len(reports) - 1)]
+
+        paths = list(dict.fromkeys(list(reports) + [path for pair in pairs for path in pair]))
+        passwords = [kwargs.get("passwords", {}).get(path, "") for path in paths]
+
+        output_paths = [None] * len(pairs)
+        if kwargs.get("to_html", False):
+            output_dir = kwargs.get("output_dir", "./")
+            output_paths = [os.path.join(output_dir, "%s_%s.html" % (_report_name(old), _report_name(new)))
+                            for (new, old) in pairs]
+
+        with ProcessPoolExecutor(max_workers=kwargs.get("workers")) as executor:
+            trees = executor.map(_load_monetary_report, paths, passwords, [kwargs.get("cache")] * len(paths))
+            trees = dict(zip(paths, trees))
+
+            results = executor.map(_compare_loaded_reports, [trees[new] for (new, _) in pairs],
+                                   [trees[old] for (_, old) in pairs], output_paths,
+                                   [kwargs.get("tokenizer", "jieba")] * len(pairs),
+                                   [kwargs.get("segment_cache")] * len(pairs))
+
+            return list(results)
 
-    def compare_text(self, new_text, old_text, join=False):
+    def compare_text(self, new_text, old_text, join=False, tokenizer=None):
         """
         对比两个字符串
         :param new_text: str，新的文本
         :param old_text: str，旧的文本
         :param join: bool
+        :param tokenizer: Union[str, Callable[[str], List[str]]]，句内对比的切词方式，char与ngram不需要加载jieba词典；
+                          为None时使用compare_report的tokenizer参数
         :return: Tuple[List[str], List[str]]，对比结果，按照句号进行划分，以优化显示效果
         """
-        new_result, old_result = align_text(new_text, old_text, join=join)
+        new_result, old_result = align_text(new_text, old_text, join=join, tokenizer=tokenizer or self.tokenizer)
 
         return new_result, old_result
 
     def _load_report(self, new_report, old_report, **kwargs):
         self.report = []
+        self.indexes = {}
 
-        parser_a = PDFParser()
-        parse_new_result = parser_a.parse(new_report, kwargs.get("password_a", ""))
-        new_index_tree = parser_a.analyze("Monetary Report", parse_new_result)
-        self.report.append(new_index_tree)
+        cache = kwargs.get("cache")
+        reports = [new_report, old_report]
+        passwords = [kwargs.get("password_a", ""), kwargs.get("password_b", "")]
 
-        parser_b = PDFParser()
-        parse_old_result = parser_b.parse(old_report, kwargs.get("password_b", ""))
-        old_index_tree = parser_b.analyze("Monetary Report", parse_old_result)
-        self.report.append(old_index_tree)
+        # 新旧报告互不依赖，默认在两个进程中同时解析；文件对象与mmap无法传给子进程，在当前进程中解析
+        if kwargs.get("concurrent", True) and all(isinstance(report, (str, bytes, os.PathLike)) for report in reports):
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                self.report = list(executor.map(_load_monetary_report, reports, passwords, [cache] * 2))
+        else:
+            self.report = [_load_monetary_report(reports[i], passwords[i], cache) for i in range(2)]
 
-    def _to_stdout(self):
+    def _to_stdout(self, sections=None):
+        # sections为_compare_sections的结果，同一次对比可以多次、以多种格式渲染；为None时重新对比
         comparison_result = []
+        sections = self._render_sections(sections or self._compare_sections(), join=False)
 
-        # title
-        path = [["t"]]
-        new_ctt = self._find_content(self.report[0], path)[0].replace(" ", "").strip("。")
-        old_ctt = self._find_content(self.report[1], path)[0].replace(" ", "").strip("。")
-        comparison_result.append(("项目", "", new_ctt, old_ctt))
-
-        # 总体基调
-        path = [["c5"], ["c1"], ["p2"]]
-        new_ctt, old_ctt = self._align_continuous_text([path], join=False)
-        comparison_result.append(("总体基调", "", new_ctt, old_ctt))
-
-        # 货币政策展望
-        ## 流动性基调
-        path = [["c5"], ["c2"], ["ps1", "p1s-1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["稳健的货币政策", "大水漫灌", "货币政策稳定性"], join=False)
-        comparison_result.append(("货币政策展望", "流动性", new_ctt, old_ctt))
-
-        ## 风险防控
-        path = [["c5"], ["c2"], ["ps1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["金融风险"], join=False)
-        comparison_result.append(("货币政策展望", "风险防控", new_ctt, old_ctt))
-
-        ## 房地产
-        path = [["c5"], ["c2"], ["ps-1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["房子"], join=False)
-        comparison_result.append(("货币政策展望", "房地产", new_ctt, old_ctt))
-
-        ## 信贷总量
-        path = [["c5"], ["c2"], ["p3"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["再贷款", "再贴现", "信贷", "工具", "总闸门"], join=False)
-        comparison_result.append(("货币政策展望", "信贷总量", new_ctt, old_ctt))
-
-        ## 信贷结构
-        path = [["c5"], ["c2"], ["p4"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["再贷款", "再贴现", "信贷", "工具", "总闸门"], join=False)
-        comparison_result.append(("货币政策展望", "信贷结构", new_ctt, old_ctt))
-
-        ## 汇率
-        path = [["c5"], ["c2"], ["ps1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["汇率"], join=False)
-        comparison_result.append(("货币政策展望", "汇率", new_ctt, old_ctt))
-
-        # 货币政策回顾
-        ## 流动性
-        path = [["c1"], ["c"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["流动性"], join=False)
-        comparison_result.append(("货币政策回顾", "流动性", new_ctt, old_ctt))
-
-        ## 政策工具
-        path = [["c2"], ["c"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["操作", "便利", "货币信贷", "准备金率"], join=False)
-        comparison_result.append(("货币政策回顾", "政策工具", new_ctt, old_ctt))
-
-        ## 宏观审慎
-        path = [["c2"], ["c"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["宏观审慎"], join=False)
-        comparison_result.append(("货币政策回顾", "宏观审慎", new_ctt, old_ctt))
-
-        ## 信贷
-        path = [["c2"], ["c"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["信贷政策"], join=False)
-        comparison_result.append(("货币政策回顾", "信贷", new_ctt, old_ctt))
-
-        ## 汇率
-        path1 = [["c1"], ["c"], ["t"]]
-        path2 = [["c2"], ["c"], ["p1s1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path1, path2], ["汇率"], join=False)
-        comparison_result.append(("货币政策回顾", "汇率", new_ctt, old_ctt))
-
-        ## 本外币存款
-        path = [["c1"], ["c2"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["贷款", "存款"], join=False)
-        comparison_result.append(("货币政策回顾", "本外币存款", new_ctt, old_ctt))
-
-        ## 社融
-        path = [["c1"], ["c"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["社会融资"], join=False)
-        comparison_result.append(("货币政策回顾", "社融", new_ctt, old_ctt))
-
-        ## 风险处置
-        path = [["c2"], ["c"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], ["金融风险"], join=False)
-        comparison_result.append(("货币政策回顾", "风险处置", new_ctt, old_ctt))
-
-        # 世界经济形势
-        ## 经济增速
-        path = [["c4"], ["c1"], ["c1"], ["p1s1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("世界经济形势", "经济增速", new_ctt, old_ctt))
-
-        # 国内经济形势
-        ## 经济增速
-        path1 = [["c4"], ["c2"], ["p1s1"]]
-        path2 = [["c4"], ["c1"], ["p1s1", "p2s1", "p3s1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path1, path2], join=False)
-        comparison_result.append(("国内经济形势", "经济增速", new_ctt, old_ctt))
-
-        # 消费
-        path = [["c4"], ["c2"], ["c1"], ["p1s1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("国内经济形势", "消费", new_ctt, old_ctt))
-
-        # 投资
-        path = [["c4"], ["c2"], ["c1"], ["p2s1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("国内经济形势", "投资", new_ctt, old_ctt))
-
-        # 进出口
-        path = [["c4"], ["c2"], ["c1"], ["p3s1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("国内经济形势", "进出口", new_ctt, old_ctt))
-
-        # 农业
-        path = [["c4"], ["c2"], ["c2"], ["p2s1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("国内经济形势", "农业", new_ctt, old_ctt))
-
-        # 工业
-        path = [["c4"], ["c2"], ["c2"], ["p3s1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("国内经济形势", "工业", new_ctt, old_ctt))
-
-        # 服务业
-        path = [["c4"], ["c2"], ["c2"], ["p4s1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("国内经济形势", "服务业", new_ctt, old_ctt))
-
-        # 财政收支
-        path = [["c4"], ["c2"], ["c4"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("国内经济形势", "财政与就业", new_ctt, old_ctt))
-
-        # 价格形势
-        ## 总体趋势
-        path = [["c5"], ["c1"], ["p4s1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("价格形势", "总体趋势", new_ctt, old_ctt))
-
-        ## CPI
-        path = [["c4"], ["c2"], ["c3"], ["p1s1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("价格形势", "CPI", new_ctt, old_ctt))
-
-        ## PPI
-        path = [["c4"], ["c2"], ["c3"], ["p2s1"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("价格形势", "PPI", new_ctt, old_ctt))
-
-        # 金融市场运行回顾
-        ## 货币市场
-        path = [["c3"], ["c1"], ["c1"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("金融市场运行回顾", "货币市场", new_ctt, old_ctt))
-
-        ## 债券市场
-        path = [["c3"], ["c1"], ["c2"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("金融市场运行回顾", "债券市场", new_ctt, old_ctt))
-
-        ## 票据市场
-        path = [["c3"], ["c1"], ["c3"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("金融市场运行回顾", "票据市场", new_ctt, old_ctt))
-
-        ## 股票市场
-        path = [["c3"], ["c1"], ["c4"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("金融市场运行回顾", "股票市场", new_ctt, old_ctt))
-
-        ## 保险市场
-        path = [["c3"], ["c1"], ["c5"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("金融市场运行回顾", "保险市场", new_ctt, old_ctt))
-
-        ## 外汇市场
-        path = [["c3"], ["c1"], ["c6"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("金融市场运行回顾", "外汇市场", new_ctt, old_ctt))
-
-        ## 黄金市场
-        path = [["c3"], ["c1"], ["c7"], ["t"]]
-        new_ctt, old_ctt = self._align_discrete_text([path], join=False)
-        comparison_result.append(("金融市场运行回顾", "黄金市场", new_ctt, old_ctt))
+        for ((str1, str2, _, _, _), (new_ctt, old_ctt)) in zip(MONETARY_REPORT_SPEC, sections):
+            comparison_result.append((str1, str2, new_ctt, old_ctt))
 
         return comparison_result
 
-    def _to_html(self, output_path):
+    def _to_html(self, output_path, sections=None):
         if not self.report:
             raise AttributeError("haven't call load_report interface.")
 
+        sections = self._render_sections(sections or self._compare_sections(), join=True)
+
         with open(output_path, "w", encoding="utf-8") as f:
             css = get_css()
             f.write(css + "\n")
             f.write("<table>\n")
 
-            # title
-            path = [["t"]]
-            new_ctt = self._find_content(self.report[0], path)[0].replace(" ", "").strip("。")
-            old_ctt = self._find_content(self.report[1], path)[0].replace(" ", "").strip("。")
-            self._write_to_frame(f, "项目", "", new_ctt, old_ctt, header=True)
-
-            # 总体基调
-            path = [["c5"], ["c1"], ["p2"]]
-            new_ctt, old_ctt = self._align_continuous_text([path])
-            self._write_to_frame(f, "总体基调", "", new_ctt, old_ctt)
-
-            # 货币政策展望
-            ## 流动性基调
-            path = [["c5"], ["c2"], ["ps1", "p1s-1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["稳健的货币政策", "大水漫灌", "货币政策稳定性"])
-            self._write_to_frame(f, "货币政策展望", "流动性", new_ctt, old_ctt, 6)
-
-            ## 风险防控
-            path = [["c5"], ["c2"], ["ps1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["金融风险"])
-            self._write_to_frame(f, "", "风险防控", new_ctt, old_ctt)
-
-            ## 房地产
-            path = [["c5"], ["c2"], ["ps-1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["房子"])
-            self._write_to_frame(f, "", "房地产", new_ctt, old_ctt)
-
-            ## 信贷总量
-            path = [["c5"], ["c2"], ["p3"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["再贷款", "再贴现", "信贷", "工具", "总闸门"])
-            self._write_to_frame(f, "", "信贷总量", new_ctt, old_ctt)
-
-            ## 信贷结构
-            path = [["c5"], ["c2"], ["p4"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["再贷款", "再贴现", "信贷", "工具", "总闸门"])
-            self._write_to_frame(f, "", "信贷结构", new_ctt, old_ctt)
-
-            ## 汇率
-            path = [["c5"], ["c2"], ["ps1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["汇率"])
-            self._write_to_frame(f, "", "汇率", new_ctt, old_ctt)
-
-            # 货币政策回顾
-            ## 流动性
-            path = [["c1"], ["c"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["流动性"])
-            self._write_to_frame(f, "货币政策回顾", "流动性", new_ctt, old_ctt, 8)
-
-            ## 政策工具
-            path = [["c2"], ["c"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["操作", "便利", "货币信贷", "准备金率"])
-            self._write_to_frame(f, "", "政策工具", new_ctt, old_ctt)
-
-            ## 宏观审慎
-            path = [["c2"], ["c"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["宏观审慎"])
-            self._write_to_frame(f, "", "宏观审慎", new_ctt, old_ctt)
-
-            ## 信贷
-            path = [["c2"], ["c"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["信贷政策"])
-            self._write_to_frame(f, "", "信贷", new_ctt, old_ctt)
-
-            ## 汇率
-            path1 = [["c1"], ["c"], ["t"]]
-            path2 = [["c2"], ["c"], ["p1s1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path1, path2], ["汇率"])
-            self._write_to_frame(f, "", "汇率", new_ctt, old_ctt)
-
-            ## 本外币存款
-            path = [["c1"], ["c2"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["贷款", "存款"])
-            self._write_to_frame(f, "", "本外币存贷款", new_ctt, old_ctt)
-
-            ## 社融
-            path = [["c1"], ["c"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["社会融资"])
-            self._write_to_frame(f, "", "社融", new_ctt, old_ctt)
-
-            ## 风险处置
-            path = [["c2"], ["c"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path], ["金融风险"])
-            self._write_to_frame(f, "", "风险处置", new_ctt, old_ctt)
-
-            # 世界经济形势
-            ## 经济增速
-            path = [["c4"], ["c1"], ["c1"], ["p1s1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "世界经济形势", "经济增速", new_ctt, old_ctt)
-
-            # 国内经济形势
-            ## 经济增速
-            path1 = [["c4"], ["c2"], ["p1s1"]]
-            path2 = [["c4"], ["c1"], ["p1s1", "p2s1", "p3s1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path1, path2])
-            self._write_to_frame(f, "国内经济形势", "经济增速", new_ctt, old_ctt, 8)
-
-            # 消费
-            path = [["c4"], ["c2"], ["c1"], ["p1s1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "消费", new_ctt, old_ctt)
-
-            # 投资
-            path = [["c4"], ["c2"], ["c1"], ["p2s1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "投资", new_ctt, old_ctt)
-
-            # 进出口
-            path = [["c4"], ["c2"], ["c1"], ["p3s1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "进出口", new_ctt, old_ctt)
-
-            # 农业
-            path = [["c4"], ["c2"], ["c2"], ["p2s1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "农业", new_ctt, old_ctt)
-
-            # 工业
-            path = [["c4"], ["c2"], ["c2"], ["p3s1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "工业", new_ctt, old_ctt)
-
-            # 服务业
-            path = [["c4"], ["c2"], ["c2"], ["p4s1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "服务业", new_ctt, old_ctt)
-
-            # 财政收支
-            path = [["c4"], ["c2"], ["c4"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "财政与就业", new_ctt, old_ctt)
-
-            # 价格形势
-            ## 总体趋势
-            path = [["c5"], ["c1"], ["p4s1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "价格形势", "总体趋势", new_ctt, old_ctt, 3)
-
-            ## CPI
-            path = [["c4"], ["c2"], ["c3"], ["p1s1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "CPI", new_ctt, old_ctt)
-
-            ## PPI
-            path = [["c4"], ["c2"], ["c3"], ["p2s1"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "PPI", new_ctt, old_ctt)
-
-            # 金融市场运行回顾
-            ## 货币市场
-            path = [["c3"], ["c1"], ["c1"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "金融市场运行回顾", "货币市场", new_ctt, old_ctt, 7)
-
-            ## 债券市场
-            path = [["c3"], ["c1"], ["c2"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "债券市场", new_ctt, old_ctt)
-
-            ## 票据市场
-            path = [["c3"], ["c1"], ["c3"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "票据市场", new_ctt, old_ctt)
-
-            ## 股票市场
-            path = [["c3"], ["c1"], ["c4"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "股票市场", new_ctt, old_ctt)
-
-            ## 保险市场
-            path = [["c3"], ["c1"], ["c5"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "保险市场", new_ctt, old_ctt)
-
-            ## 外汇市场
-            path = [["c3"], ["c1"], ["c6"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "外汇市场", new_ctt, old_ctt)
-
-            ## 黄金市场
-            path = [["c3"], ["c1"], ["c7"], ["t"]]
-            new_ctt, old_ctt = self._align_discrete_text([path])
-            self._write_to_frame(f, "", "黄金市场", new_ctt, old_ctt)
+            for ind, (str1, str2, method, path_list, keywords) in enumerate(MONETARY_REPORT_SPEC):
+                new_ctt, old_ctt = sections[ind]
+
+                if method == "title":
+                    self._write_to_frame(f, str1, str2, new_ctt, old_ctt, header=True)
+                    continue
+
+                # 同一一级名称的连续行合并单元格
+                if ind > 0 and MONETARY_REPORT_SPEC[ind - 1][0] == str1:
+                    self._write_to_frame(f, "", str2, new_ctt, old_ctt)
+                else:
+                    rowspan = 1
+                    while ind + rowspan < len(MONETARY_REPORT_SPEC) and MONETARY_REPORT_SPEC[ind + rowspan][0] == str1:
+                        rowspan += 1
+                    self._write_to_frame(f, str1, str2, new_ctt, old_ctt, rowspan)
 
             f.write("</table>\n")
 
-    def _align_discrete_text(self, path_list, keywords=None, join=True):
+    def _compare_sections(self):
+        # 各对比项互不依赖；并行时每个子进程只接收一次目录树，结果按MONETARY_REPORT_SPEC的顺序返回
+        # title为(新标题, 旧标题)，continuous为DiffResult，discrete为每个路径的DiffResult列表
+        sections = [(method, path_list, keywords) for (_, _, method, path_list, keywords) in MONETARY_REPORT_SPEC]
+
+        if self.align_workers <= 1:
+            return [self._compare_section(*section) for section in sections]
+
+        results = []
+        with ProcessPoolExecutor(max_workers=self.align_workers, initializer=_init_section_worker,
+                                 initargs=(self.report, self.tokenizer, self.segment_cache)) as executor:
+            for (result, added) in executor.map(_compare_section_in_worker, sections):
+                results.append(result)
+                SEGMENT_CACHE.update(added)
+
+        return results
+
+    def _compare_section(self, method, path_list, keywords=None):
+        if method == "title":
+            new_ctt = self._find_content(self.report[0], path_list[0])[0].replace(" ", "").strip("。")
+            old_ctt = self._find_content(self.report[1], path_list[0])[0].replace(" ", "").strip("。")
+
+            return new_ctt, old_ctt
+
+        elif method == "continuous":
+            return self._align_continuous_text(path_list)
+
+        else:
+            return self._align_discrete_text(path_list, keywords)
+
+    def _render_sections(self, sections, join=True):
+        # 把_compare_sections的结果渲染为html，join=False时各对比项为句子列表
+        rendered = []
+
+        for ((_, _, method, _, _), section) in zip(MONETARY_REPORT_SPEC, sections):
+            if method == "title":
+                rendered.append(section)
+
+            elif method == "continuous":
+                rendered.append(section.to_html() if join else section.html_sentences())
+
+            else:
+                rendered.append(self._render_discrete_text(section, join))
+
+        return rendered
+
+    def _render_discrete_text(self, results, join=True):
         new_result, old_result = [], []
 
+        for result in results:
+            res_a, res_b = result.to_html(join)
+
+            if join:
+                new_result.append(res_a)
+                old_result.append(res_b)
+            else:
+                new_result += res_a
+                old_result += res_b
+
+        new_result = [i for i in new_result if i]
+        old_result = [i for i in old_result if i]
+
+        if join:
+            new_result = "<br><br>".join(new_result)
+            old_result = "<br><br>".join(old_result)
+
+        return new_result, old_result
+
+    def _align_discrete_text(self, path_list, keywords=None):
+        results = []
+
         for path in path_list:
             text_a_list = self._find_content(self.report[0], path, keywords)
             text_b_list = self._find_content(self.report[1], path, keywords)
@@ -867,164 +745,24 @@ class MonetaryReportComparer:
             paragraph_a = "".join(text_a_list)
             paragraph_b = "".join(text_b_list)
 
-            res_a, res_b = align_text(paragraph_a, paragraph_b, join)
+            results.append(diff_text(paragraph_a, paragraph_b, tokenizer=self.tokenizer))
 
-            if join:
-                new_result.append(res_a)
-                old_result.append(res_b)
-            else:
-                new_result += res_a
-                old_result += res_b
-
-        new_result = [i for i in new_result if i]
-        old_result = [i for i in old_result if i]
-
-        if join:
-            new_result = "<br><br>".join(new_result)
-            old_result = "<br><br>".join(old_result)
-
-        return new_result, old_result
+        return results
 
-    def _align_continuous_text(self, path_list, join=True):
+    def _align_continuous_text(self, path_list):
         paragraph_a = self._find_content(self.report[0], path_list[0])[0]
         paragraph_b = self._find_content(self.report[1], path_list[0])[0]
-        new_result, old_result = align_text(paragraph_a, paragraph_b)
 
-        if not join:
-            new_result = new_result.split("<br><br>")
-            old_result = old_result.split("<br><br>")
-
-        return new_result, old_result
+        return diff_text(paragraph_a, paragraph_b, tokenizer=self.tokenizer)
 
     def _find_content(self, tree, path, keywords=None):
         # path = [[c1], [c2], [t], [p1s1s2, p2]]
-        path = path.copy()
-        result = [tree]
-        cache = []
-
-        while path:
-            route = path.pop(0)
-            for ind in range(len(result)):
-                tree = result[ind]
-
-                for r in route:
-                    if r.startswith("c"):
-                        if r == "c":
-                            for c in tree.children:
-                                cache.append(c)
-                        else:
-                            index = int(r[1:]) - 1
-                            try:
-                                position = tree.children[index]
-                                cache.append(position)
-                            except IndexError:
-                                pass
-                    elif r.startswith("t"):
-                        try:
-                            position = tree.title
-                            head = position[:4]
-                            if "、" in head:
-                                start = head.index("、") + 1
-                            elif "）" in head:
-                                start = head.index("）") + 1
-                            elif "." in head:
-                                start = head.index(".") + 1
-                            else:
-                                start = 0
-                            position = position[start:]
-                            cache.append(position + "。")
-                        except IndexError:
-                            pass
-                    elif r.startswith("p"):
-                        if "s" in r:
-                            first_s = r.index("s")
-                            if r[:first_s] == "p":
-                                for paragraphs in tree.paragraphs:
-                                    try:
-                                        sents = r[first_s + 1:].split("s")
-                                        paragraphs = re.split("[。？！]", paragraphs)
-                                        for s in sents:
-                                            try:
-                                                position = paragraphs[int(s) - 1]
-                                                head = position[:3]
-                                                if "是" in head:
-                                                    start = position.index("是") + 1
-                                                else:
-                                                    start = 0
-                                                position = position[start:]
-                                                cache.append(position + "。")
-                                            except IndexError:
-                                                pass
-                                    except IndexError:
-                                        pass
-
-                            else:
-                                index = int(r[1:first_s]) - 1
-                                try:
-                                    sents = r[first_s + 1:].split("s")
-                                    paragraphs = re.split("[。？！]", tree.paragraphs[index])
-                                    for s in sents:
-                                        try:
-                                            position = paragraphs[int(s) - 1]
-                                            head = position[:3]
-                                            if "是" in head:
-                                                start = position.index("是") + 1
-                                            else:
-                                                start = 0
-                                            position = position[start:]
-                                            cache.append(position + "。")
-                                        except IndexError:
-                                            pass
-                                except IndexError:
-                                    pass
-
-                        else:
-                            if r == "p":
-                                for position in tree.paragraphs:
-                                    try:
-                                        head = position[:3]
-                                        if "是" in head:
-                                            start = position.index("是") + 1
-                                        else:
-                                            start = 0
-                                        position = position[start:]
-                                        cache.append(position + "。")
-                                    except IndexError:
-                                        pass
-
-                            else:
-                                index = int(r[1:]) - 1
-                                try:
-                                    position = tree.paragraphs[index]
-                                    head = position[:3]
-                                    if "是" in head:
-                                        start = position.index("是") + 1
-                                    else:
-                                        start = 0
-                                    position = position[start:]
-                                    cache.append(position + "。")
-                                except IndexError:
-                                    pass
-                    else:
-                        raise ValueError("find_content")
-
-            result = cache
-            cache = []
-
-        if keywords:
-            cache = result
-            result = []
-
-            for res in cache:
-                score = 0
-                for kw in keywords:
-                    if kw in res:
-                        score += 1
-
-                if score / len(keywords) >= 0.1:
-                    result.append(res)
+        index = self.indexes.get(id(tree))
+        if index is None or index[0] is not tree:
+            index = (tree, TreeIndex(tree, MONETARY_REPORT_KEYWORDS))
+            self.indexes[id(tree)] = index
 
-        return result
+        return index[1].find(path, keywords)
 
     def _write_to_frame(self, f, str1, str2, new_ctt, old_ctt, rowspan1=1, rowspan2=1, header=False, reverse=False):
         if reverse:
@@ -1066,6 +804,68 @@ class MonetaryReportComparer:
             f.write(" </tr>\n")
 
 
+def _load_monetary_report(input_path, password="", cache=None):
+    parser = PDFParser()
+
+    return parser.load("Monetary Report", input_path, password, cache)
+
+
+def _compare_loaded_reports(new_index_tree, old_index_tree, output_path=None, tokenizer="jieba", segment_cache=None):
+    comparer = MonetaryReportComparer()
+    comparer.report = [new_index_tree, old_index_tree]
+    comparer.tokenizer = tokenizer
+
+    if segment_cache is not None:
+        SEGMENT_CACHE.load(segment_cache)
+
+    if output_path is not None:
+        comparer._to_html(output_path)
+        result = output_path
+    else:
+        result = comparer._to_stdout()
+
+    if segment_cache is not None:
+        SEGMENT_CACHE.save(segment_cache)
+
+    return result
+
+
+def _check_align_workers(align_workers):
+    # None为CPU核数；不大于1的值都在当前进程中依次对齐，避免创建max_workers=0的进程池
+    if align_workers is None:
+        return os.cpu_count() or 1
+
+    if isinstance(align_workers, bool) or not isinstance(align_workers, int):
+        raise TypeError("align_workers must be an int or None, got %r" % (align_workers,))
+
+    return max(align_workers, 1)
+
+
+# 对齐进程中的对比器，由_init_section_worker设置
+_section_comparer = None
+
+
+def _init_section_worker(report, tokenizer, segment_cache=None):
+    global _section_comparer
+
+    _section_comparer = MonetaryReportComparer()
+    _section_comparer.report = report
+    _section_comparer.tokenizer = tokenizer
+
+    if segment_cache is not None:
+        SEGMENT_CACHE.load(segment_cache)
+    SEGMENT_CACHE.record_added = True
+
+
+def _compare_section_in_worker(section):
+    # 同时返回本次新分词的句子，由主进程并入分词缓存
+    return _section_comparer._compare_section(*section), SEGMENT_CACHE.take_added()
+
+
+def _report_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
 if __name__ == '__main__':
     # agent = MonetaryReportComparer()
     # # my_result = agent.compare_text("新的一年继续落实和发挥好结构性货币政策工具的牵引带动作用。保持再贷款、再贴现政策稳定性，继续对涉农、小微企业、民营企业提供普惠性、持续性的资金支持。", "继续落实和发挥好结构性货币政策工具的牵引带动作用,运用好碳减排支持工具推动绿色低碳发展。保持再贷款、再贴现政策稳定性，实施好两项直达实体经济货币政策工具的延期工作，继续对涉农、小微企业、民营企业提供普惠性、持续性的资金支持。")
@@ -0,0 +1,239 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections.abc import Mapping
+from functools import lru_cache
+from importlib import metadata
+
+
+# 文件格式：文件头 | 槽位表（uint32，记录偏移+1，0为空） | 记录（int64词频、uint16词长、utf-8词） | 用户词（json）
+SNAPSHOT_MAGIC = b"JBSNAP1\0"
+HEADER = struct.Struct("<8s32sdIIQ")
+RECORD = struct.Struct("<qH")
+# 查询结果（包括不存在的词）最多缓存的条数
+LOOKUP_CACHE_SIZE = 1 << 16
+
+
+class SnapshotDictionary(Mapping):
+    def __init__(self, path, lookup_cache_size=LOOKUP_CACHE_SIZE):
+        """
+        以mmap只读方式打开的jieba前缀词典，多个进程共享同一份页面缓存，打开时不读入词典
+        :param path: str，build_snapshot生成的文件
+        :param lookup_cache_size: int，查询结果的LRU缓存条数
+        """
+        with open(path, "rb") as f:
+            self.__buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, fingerprint, total, slot_count, entry_count, words_offset) = HEADER.unpack_from(self.__buffer)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("%s is not a dictionary snapshot" % path)
+
+        self.fingerprint = fingerprint.hex()
+        self.total = total
+        self.user_words = json.loads(self.__buffer[words_offset:].decode("utf-8"))
+
+        self.__mask = slot_count - 1
+        self.__count = entry_count
+        self.__slots = memoryview(self.__buffer)[HEADER.size: HEADER.size + 4 * slot_count].cast("I")
+        self.__records = HEADER.size + 4 * slot_count
+        # 加载后新增的词（如jieba.add_word）；分词时同一个前缀会被反复查询，快照中的查询结果放在有界的LRU缓存中
+        self.__added = {}
+        self.__cached_lookup = lru_cache(maxsize=lookup_cache_size)(self._lookup)
+
+    def __getitem__(self, word):
+        freq = self.get(word)
+        if freq is None:
+            raise KeyError(word)
+
+        return freq
+
+    def __setitem__(self, word, freq):
+        self.__added[word] = freq
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def __len__(self):
+        return self.__count + sum(1 for word in self.__added if self._lookup(word) is None)
+
+    def __iter__(self):
+        found = set()
+        position = self.__records
+        for _ in range(self.__count):
+            (_, length) = RECORD.unpack_from(self.__buffer, position)
+            position += RECORD.size
+            word = self.__buffer[position: position + length].decode("utf-8")
+            position += length
+
+            found.add(word)
+            yield word
+
+        yield from (word for word in list(self.__added) if word not in found)
+
+    def get(self, word, default=None):
+        if word in self.__added:
+            return self.__added[word]
+
+        freq = self.__cached_lookup(word)
+
+        return default if freq is None else freq
+
+    def _lookup(self, word):
+        key = word.encode("utf-8")
+        slot = zlib.crc32(key) & self.__mask
+
+        while True:
+            offset = self.__slots[slot]
+            if not offset:
+                return None
+
+            position = self.__records + offset - 1
+            (freq, length) = RECORD.unpack_from(self.__buffer, position)
+            if self.__buffer[position + RECORD.size: position + RECORD.size + length] == key:
+                return freq
+
+            slot = (slot + 1) & self.__mask
+
+
+def dictionary_fingerprint(userdict_path):
+    """
+    :param userdict_path: str，用户词典路径
+    :return: str，jieba版本与用户词典内容的哈希，二者不变时快照可复用
+    """
+    digest = hashlib.sha256(metadata.version("jieba").encode("utf-8"))
+    with open(userdict_path, "rb") as f:
+        digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def default_snapshot_path(userdict_path):
+    """
+    :param userdict_path: str，用户词典路径
+    :return: str，与用户词典同目录、同名的.snapshot文件
+    """
+    return os.path.splitext(userdict_path)[0] + ".snapshot"
+
+
+def build_snapshot(output_path, userdict_path):
+    """
+    加载jieba默认词典与用户词典，将完整的前缀词典写为快照
+    :param output_path: str，快照路径
+    :param userdict_path: str，用户词典路径
+    :return: jieba.Tokenizer，已初始化的分词器
+    """
+    import jieba
+
+    tokenizer = jieba.Tokenizer()
+    tokenizer.initialize()
+    user_words = _load_userdict(tokenizer, userdict_path)
+
+    entries = [(word.encode("utf-8"), freq) for word, freq in tokenizer.FREQ.items()]
+    slot_count = 1 << max(len(entries) * 2 - 1, 1).bit_length()
+    mask = slot_count - 1
+    slots = [0] * slot_count
+    records = bytearray()
+
+    for key, freq in entries:
+        slot = zlib.crc32(key) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = len(records) + 1
+        records += RECORD.pack(freq, len(key)) + key
+
+    words_offset = HEADER.size + 4 * slot_count + len(records)
+    header = HEADER.pack(SNAPSHOT_MAGIC, bytes.fromhex(dictionary_fingerprint(userdict_path)), tokenizer.total,
+                         slot_count, len(entries), words_offset)
+
+    temp_path = "%s.%d.tmp" % (output_path, os.getpid())
+    with open(temp_path, "wb") as f:
+        f.write(header)
+        f.write(struct.pack("<%dI" % slot_count, *slots))
+        f.write(records)
+        f.write(json.dumps(user_words, ensure_ascii=False).encode("utf-8"))
+    os.replace(temp_path, output_path)
+
+    return tokenizer
+
+
+def load_tokenizer(userdict_path, snapshot_path=None):
+    """
+    获取加载了用户词典的jieba分词器：快照存在且与当前jieba版本、用户词典一致时直接映射快照，否则加载词典并生成快照
+    :param userdict_path: str，用户词典路径
+    :param snapshot_path: str，快照路径，默认为default_snapshot_path(userdict_path)
+    :return: jieba.Tokenizer
+    """
+    import jieba
+    from jieba import finalseg
+
+    fingerprint = dictionary_fingerprint(userdict_path)
+    if snapshot_path is None:
+        snapshot_path = default_snapshot_path(userdict_path)
+
+    try:
+        dictionary = SnapshotDictionary(snapshot_path)
+    except (OSError, ValueError, struct.error):
+        dictionary = None
+
+    if dictionary is None or dictionary.fingerprint != fingerprint:
+        try:
+            return build_snapshot(snapshot_path, userdict_path)
+        except OSError:
+            # 无法写入快照时仍返回可用的分词器
+            tokenizer = jieba.Tokenizer()
+            tokenizer.load_userdict(userdict_path)
+            return tokenizer
+
+    tokenizer = jieba.Tokenizer()
+    tokenizer.FREQ = dictionary
+    tokenizer.total = dictionary.total
+    tokenizer.initialized = True
+
+    for (word, freq, tag) in dictionary.user_words:
+        if tag:
+            tokenizer.user_word_tag_tab[word] = tag
+        if freq == 0:
+            finalseg.add_force_split(word)
+
+    return tokenizer
+
+
+def _load_userdict(tokenizer, userdict_path):
+    # 与jieba.Tokenizer.load_userdict相同，另外记录每个词最终的词频与词性，供加载快照时恢复
+    import jieba
+
+    user_words = []
+
+    with open(userdict_path, "rb") as f:
+        for line in f:
+            line = line.strip().decode("utf-8").lstrip("﻿")
+            if not line:
+                continue
+
+            word, freq, tag = jieba.re_userdict.match(line).groups()
+            freq = freq.strip() if freq is not None else None
+            tag = tag.strip() if tag is not None else None
+
+            tokenizer.add_word(word, freq, tag)
+            user_words.append((word, tokenizer.FREQ[word], tag))
+
+    return user_words
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="生成jieba词典快照，部署后各进程直接映射快照，不再加载词典")
+    arg_parser.add_argument("--userdict", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "userdict.txt"))
+    arg_parser.add_argument("--output", help="快照路径，默认与用户词典同目录")
+    args = arg_parser.parse_args()
+
+    output_path = args.output or default_snapshot_path(args.userdict)
+    build_snapshot(output_path, args.userdict)
+    print(output_path)
+
+
+if __name__ == "__main__":
+    main()
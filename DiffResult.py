@@ -0,0 +1,147 @@
+import json
+
+
+DELETE_COLOR = "#4169E1"
+INSERT_COLOR = "#FF69B4"
+
+
+class DiffSpan:
+    __slots__ = ("op", "text", "start", "end", "clause")
+
+    def __init__(self, op, text, start, end, clause=None):
+        """
+        对比结果中的一段文本
+        :param op: str，equal、insert、delete、replace
+        :param text: str
+        :param start: int，在原文本中的起点
+        :param end: int，在原文本中的终点
+        :param clause: int，所在句子（按标点切分）的序号；两个句子之间的标点为None
+        """
+        self.op = op
+        self.text = text
+        self.start = start
+        self.end = end
+        self.clause = clause
+
+    def __repr__(self):
+        return "DiffSpan(%r, %r, %d, %d, %r)" % (self.op, self.text, self.start, self.end, self.clause)
+
+    def __eq__(self, other):
+        return isinstance(other, DiffSpan) and self.to_tuple() == other.to_tuple()
+
+    def to_tuple(self):
+        return self.op, self.text, self.start, self.end, self.clause
+
+
+class DiffResult:
+    def __init__(self, text_a, text_b, spans_a, spans_b, alignment):
+        """
+        两段文本的对比结果，渲染为html、纯文本或json时才生成字符串，同一结果可以多次、以多种格式渲染
+        :param text_a: str，新的文本
+        :param text_b: str，旧的文本
+        :param spans_a: List[DiffSpan]，新文本的标注，replace与insert为新增的内容
+        :param spans_b: List[DiffSpan]，旧文本的标注，replace与delete为删除的内容
+        :param alignment: List[Tuple[Union[int, None], Union[int, None]]]，句子的匹配，(新句子序号, 旧句子序号)，
+                          未匹配的一侧为None
+        """
+        self.text_a = text_a
+        self.text_b = text_b
+        self.spans_a = spans_a
+        self.spans_b = spans_b
+        self.alignment = alignment
+
+    def sentences(self, render_a, render_b):
+        """
+        按句号分句，逐段渲染
+        :param render_a: Callable[[DiffSpan], str]，新文本中句子内各段的渲染方式
+        :param render_b: Callable[[DiffSpan], str]，旧文本中句子内各段的渲染方式
+        :return: Tuple[List[str], List[str]]，不含句号的句子
+        """
+        return _split_sentences(self.spans_a, render_a), _split_sentences(self.spans_b, render_b)
+
+    def to_html(self, join=True, delete_color=DELETE_COLOR, insert_color=INSERT_COLOR):
+        """
+        :param join: bool，True时返回以<br><br>分句的字符串，否则返回以句号结尾的句子列表
+        :param delete_color: str，删除内容的颜色
+        :param insert_color: str，新增内容的颜色
+        :return: Union[Tuple[str, str], Tuple[List[str], List[str]]]
+        """
+        new_result, old_result = self.html_sentences(delete_color, insert_color)
+
+        if join:
+            return "<br><br>".join(new_result), "<br><br>".join(old_result)
+
+        return [i + "。" for i in new_result], [i + "。" for i in old_result]
+
+    def html_sentences(self, delete_color=DELETE_COLOR, insert_color=INSERT_COLOR):
+        """
+        :return: Tuple[List[str], List[str]]，标注了差异的html句子，不含句号
+        """
+        insert = "<font color=%s>" % insert_color + "%s</font>"
+        delete = "<font color=%s><s>" % delete_color + "%s</s></font>"
+
+        return self.sentences(lambda span: insert % span.text if span.op in ("insert", "replace") else span.text,
+                              lambda span: delete % span.text if span.op in ("delete", "replace") else span.text)
+
+    def to_text(self, join=True):
+        """
+        纯文本格式，新增的内容标注为{+...+}，删除的内容标注为[-...-]
+        :param join: bool，True时返回字符串，否则返回以句号结尾的句子列表
+        :return: Union[Tuple[str, str], Tuple[List[str], List[str]]]
+        """
+        new_result, old_result = self.sentences(
+            lambda span: "{+%s+}" % span.text if span.op in ("insert", "replace") else span.text,
+            lambda span: "[-%s-]" % span.text if span.op in ("delete", "replace") else span.text)
+
+        if join:
+            return "。".join(new_result), "。".join(old_result)
+
+        return [i + "。" for i in new_result], [i + "。" for i in old_result]
+
+    def to_dict(self):
+        """
+        :return: dict，{"new", "old", "alignment"}，new与old为{"text", "spans"}，span为[op, start, end, clause]
+        """
+        return {"new": {"text": self.text_a, "spans": [[s.op, s.start, s.end, s.clause] for s in self.spans_a]},
+                "old": {"text": self.text_b, "spans": [[s.op, s.start, s.end, s.clause] for s in self.spans_b]},
+                "alignment": [list(pair) for pair in self.alignment]}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        :param data: dict，to_dict的结果
+        :return: DiffResult
+        """
+        text_a, text_b = data["new"]["text"], data["old"]["text"]
+
+        return cls(text_a, text_b,
+                   [DiffSpan(op, text_a[start: end], start, end, clause) for (op, start, end, clause) in data["new"]["spans"]],
+                   [DiffSpan(op, text_b[start: end], start, end, clause) for (op, start, end, clause) in data["old"]["spans"]],
+                   [tuple(pair) for pair in data["alignment"]])
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+
+def _split_sentences(spans, render):
+    # 句子内的文本不含标点，句号只出现在句子之间的标点中
+    sentences, current = [], []
+
+    for span in spans:
+        if span.clause is None:
+            parts = span.text.split("。")
+            current.append(parts[0])
+
+            for part in parts[1:]:
+                sentences.append("".join(current))
+                current = [part]
+        else:
+            current.append(render(span))
+
+    sentences.append("".join(current))
+
+    return sentences
@@ -0,0 +1,61 @@
+from collections import deque
+
+
+class KeywordAutomaton:
+    def __init__(self, keywords):
+        """
+        Aho–Corasick自动机：一次扫描文本即找出其中出现的全部关键词
+        :param keywords: Iterable[str]
+        """
+        self.keywords = frozenset(kw for kw in keywords if kw)
+
+        self.__goto = [{}]
+        self.__fail = [0]
+        self.__output = [frozenset()]
+
+        for kw in sorted(self.keywords):
+            state = 0
+            for ch in kw:
+                if ch not in self.__goto[state]:
+                    self.__goto.append({})
+                    self.__fail.append(0)
+                    self.__output.append(frozenset())
+                    self.__goto[state][ch] = len(self.__goto) - 1
+                state = self.__goto[state][ch]
+            self.__output[state] = frozenset([kw])
+
+        # 按广度优先设置失败指针，并合并失败指针所指状态的输出
+        queue = deque(self.__goto[0].values())
+        while queue:
+            state = queue.popleft()
+
+            for ch, next_state in self.__goto[state].items():
+                fail = self.__fail[state]
+                while fail and ch not in self.__goto[fail]:
+                    fail = self.__fail[fail]
+
+                self.__fail[next_state] = self.__goto[fail].get(ch, 0)
+                self.__output[next_state] = self.__output[next_state] | self.__output[self.__fail[next_state]]
+                queue.append(next_state)
+
+    def __contains__(self, keyword):
+        return keyword in self.keywords
+
+    def scan(self, text):
+        """
+        :param text: str
+        :return: FrozenSet[str]，text中出现的关键词
+        """
+        goto, fail, output = self.__goto, self.__fail, self.__output
+        state = 0
+        found = set()
+
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            if output[state]:
+                found |= output[state]
+
+        return frozenset(found)
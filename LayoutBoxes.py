@@ -0,0 +1,122 @@
+import numpy as np
+
+
+class LayoutBoxes:
+    def __init__(self, x0=(), height=(), page_id=(), content=(), page_labels=()):
+        """
+        列式存储的文本框：x0、height、page_id为数组列，content为字符串列；文本框按页面顺序排列。
+        一份文档只建立一次，分析器的各阶段都在其上计算，删除、合并文本框时返回新的LayoutBoxes
+        :param x0: Iterable[float]
+        :param height: Iterable[float]
+        :param page_id: Iterable[int]，文本框所在页面的序号，非递减
+        :param content: Iterable[str]
+        :param page_labels: Iterable[str]，每个页面序号对应的页码，如"O"、"III"、"12"
+        """
+        self.x0 = np.asarray(x0, dtype=np.float64)
+        self.height = np.asarray(height, dtype=np.float64)
+        self.page_id = np.asarray(page_id, dtype=np.int32)
+        self.content = list(content)
+        self.page_labels = list(page_labels)
+
+    @classmethod
+    def from_pages(cls, pages_dict):
+        """
+        :param pages_dict: OrderedDict[str, List[Tuple[float, float, str]]]，按页面划分的文本框
+        :return: LayoutBoxes，page_id为页面在pages_dict中的顺序
+        """
+        count = sum(len(value) for value in pages_dict.values())
+        boxes = [box for value in pages_dict.values() for box in value]
+        page_id = np.repeat(np.arange(len(pages_dict), dtype=np.int32), [len(value) for value in pages_dict.values()])
+
+        return cls(np.fromiter((box[0] for box in boxes), dtype=np.float64, count=count),
+                   np.fromiter((box[1] for box in boxes), dtype=np.float64, count=count),
+                   page_id,
+                   [box[2] for box in boxes],
+                   pages_dict.keys())
+
+    def __len__(self):
+        return len(self.content)
+
+    def __iter__(self):
+        return zip(self.x0.tolist(), self.height.tolist(), self.content)
+
+    def page_ranges(self):
+        """
+        :return: List[Tuple[str, int, int]]，每个页面的(页码, 起点, 终点)，没有文本框的页面起点等于终点
+        """
+        bounds = np.searchsorted(self.page_id, np.arange(len(self.page_labels) + 1)).tolist()
+
+        return [(label, bounds[i], bounds[i + 1]) for i, label in enumerate(self.page_labels)]
+
+    def mode(self, column):
+        """
+        列的众数。出现次数相同时，取首次出现位置最靠后的值
+        :param column: str，x0或height
+        :return: float
+        """
+        values = getattr(self, column)
+        _, first_index, counts = np.unique(values, return_index=True, return_counts=True)
+        most_index = first_index[counts == counts.max()].max()
+
+        return float(values[most_index])
+
+    def histogram(self, column, bins=10):
+        """
+        :param column: str，x0或height
+        :param bins: Union[int, Sequence[float]]
+        :return: Tuple[np.ndarray, np.ndarray]，每个区间的计数与区间边界
+        """
+        return np.histogram(getattr(self, column), bins=bins)
+
+    def cluster(self, column, tolerance):
+        """
+        按容差聚类：排序后相邻取值之差不超过tolerance的归为一类
+        :param column: str，x0或height
+        :param tolerance: float
+        :return: List[Tuple[float, int]]，每一类的均值与数量，按数量从多到少排列
+        """
+        values = np.sort(getattr(self, column))
+        if not len(values):
+            return []
+
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(values) > tolerance) + 1))
+        counts = np.diff(np.concatenate((starts, [len(values)])))
+        means = np.add.reduceat(values, starts) / counts
+        order = np.argsort(-counts, kind="stable")
+
+        return [(float(means[i]), int(counts[i])) for i in order]
+
+    def within(self, column, center, tolerance):
+        """
+        以center为中心、按容差归类：与center之差小于tolerance的文本框属于这一类
+        :param column: str，x0或height
+        :param center: float，如正文的x0众数
+        :param tolerance: float
+        :return: np.ndarray，bool数组
+        """
+        return np.abs(getattr(self, column) - center) < tolerance
+
+    def select(self, mask):
+        """
+        :param mask: np.ndarray，bool数组，保留为True的文本框
+        :return: LayoutBoxes
+        """
+        return LayoutBoxes(self.x0[mask], self.height[mask], self.page_id[mask],
+                           [content for content, keep in zip(self.content, mask.tolist()) if keep], self.page_labels)
+
+    def merge(self, starts):
+        """
+        把连续的文本框合并为一个：x0取第一个文本框的值，height取均值，content依次连接
+        :param starts: np.ndarray，bool数组，为True的文本框开始新的一组，同一组的文本框须在同一页面
+        :return: LayoutBoxes
+        """
+        indices = np.flatnonzero(starts)
+        if not len(indices):
+            return LayoutBoxes(page_labels=self.page_labels)
+
+        bounds = indices.tolist() + [len(self)]
+        counts = np.diff(bounds)
+
+        return LayoutBoxes(self.x0[indices], np.add.reduceat(self.height, indices) / counts, self.page_id[indices],
+                           ["".join(self.content[bounds[i]: bounds[i + 1]]) for i in range(len(indices))],
+                           self.page_labels)
@@ -0,0 +1,100 @@
+import re
+
+
+class ExclusionBlock:
+    def __init__(self, name, start, end=None, marker=None, end_on_text=False, not_text=None, single_line=None):
+        """
+        非正文块（表格、图、专栏等）的声明，块内的文本框在分析时删除
+        :param name: str，块的名称
+        :param start: str，块的起始行
+        :param end: str，块的结束行，结束行同样删除
+        :param marker: str，块的结尾标记行（如表格的数据来源），出现后遇到正文行即结束
+        :param end_on_text: bool，遇到正文行时结束，正文行保留
+        :param not_text: str，包含该模式的行不视为正文行
+        :param single_line: str，起始行同时匹配该模式时，整个块只有这一行
+        """
+        self.name = name
+        self.start = re.compile(start)
+        self.end = re.compile(end) if end is not None else None
+        self.marker = re.compile(marker) if marker is not None else None
+        self.end_on_text = end_on_text
+        self.not_text = re.compile(not_text) if not_text is not None else None
+        self.single_line = re.compile(single_line) if single_line is not None else None
+
+    def __repr__(self):
+        patterns = [p.pattern if p is not None else None
+                    for p in (self.start, self.end, self.marker, self.not_text, self.single_line)]
+
+        return "ExclusionBlock(%r, %r, end_on_text=%r)" % (self.name, patterns, self.end_on_text)
+
+
+class LayoutRule:
+    def __init__(self, name, headings, blocks):
+        """
+        一类报告的版面规则：各级标题与非正文块。所有模式合并为一个正则，每行只匹配一次
+        :param name: str，规则名称，与PDFParser.analyze的rule参数对应
+        :param headings: List[Tuple[str, str]]，(标题级别, 模式)，按优先级排列；级别相同的标题在目录树中平级
+        :param blocks: List[ExclusionBlock]，按优先级排列
+        """
+        self.name = name
+        self.headings = list(headings)
+        self.blocks = list(blocks)
+
+        self.__heading_matcher = _combine([pattern for (_, pattern) in self.headings])
+        self.__block_matcher = _combine([block.start.pattern for block in self.blocks])
+
+    def __repr__(self):
+        return "LayoutRule(%r, %r, %r)" % (self.name, self.headings, self.blocks)
+
+    def match_heading(self, text):
+        """
+        :param text: str
+        :return: Union[str, None]，标题级别，不是标题时为None
+        """
+        result = self.__heading_matcher.match(text)
+        if result:
+            return self.headings[int(result.lastgroup[1:])][0]
+
+        return None
+
+    def match_block(self, text):
+        """
+        :param text: str
+        :return: Union[ExclusionBlock, None]，以该行开始的非正文块
+        """
+        result = self.__block_matcher.match(text)
+        if result:
+            return self.blocks[int(result.lastgroup[1:])]
+
+        return None
+
+
+def _combine(patterns):
+    # 每个模式放入一个命名分组，按顺序尝试，lastgroup即为匹配到的模式序号
+    return re.compile("|".join("(?P<_%d>%s)" % (ind, pattern) for ind, pattern in enumerate(patterns)))
+
+
+MONETARY_REPORT_RULE = LayoutRule(
+    "Monetary Report",
+    headings=[
+        ("A", '第[一二三四五六七八九十]{1,2}部分'),
+        ("B", '([一二三四五六七八九十]{1,2})([.、])'),
+        ("C", '[（(][一二三四五六七八九十0-9]{1,2}[)）]'),
+        ("D", '([0-9]{1,2})([.、])'),
+    ],
+    blocks=[
+        ExclusionBlock("column", '专栏 \\d+ ', end_on_text=True, not_text='数据来源'),
+        ExclusionBlock("table", '表 \\d+ ', marker='.*?数据来源：[^。]+?。', end_on_text=True),
+        ExclusionBlock("figure", '数据来源：[^。]+?。', end='图 \\d+ ', single_line='.+?图 \\d+ '),
+    ],
+)
+
+LAYOUT_RULES = {MONETARY_REPORT_RULE.name: MONETARY_REPORT_RULE}
+
+
+def register_rule(rule):
+    """
+    注册新的报告版面规则，注册后可在PDFParser.analyze中按名称使用
+    :param rule: LayoutRule
+    """
+    LAYOUT_RULES[rule.name] = rule
@@ -1,47 +1,359 @@
+import hashlib
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import chain, islice
+
 from pdfminer.converter import PDFPageAggregator
 from pdfminer.layout import LAParams
 from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
 from pdfminer.pdfparser import PDFParser as mPDFParser, PDFDocument
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+
+from Analyzer import MonetaryPolicyReportAnalyzer, ANALYZER_VERSION
+from LayoutRules import LayoutRule, LAYOUT_RULES
+
+
+PARSER_VERSION = 1
+TOC_PATTERN = re.compile('第[一二三四五六七八九十]{1,2}部分.*?\\.{3,} *(\\d+)$')
+
 
-from Analyzer import MonetaryPolicyReportAnalyzer
+class TextOnlyPageAggregator(PDFPageAggregator):
+    # 只保留文字：不生成线条、矩形、曲线对象，这些对象不参与文本框的排版分析
+    def paint_path(self, gstate, stroke, fill, evenodd, path):
+        pass
+
+
+class TextOnlyPageInterpreter(PDFPageInterpreter):
+    # 跳过图片与表单XObject（图表），不解析其内部内容
+    def do_Do(self, xobjid):
+        pass
+
+    def do_EI(self, obj):
+        pass
 
 
 class PDFParser:
-    def __init__(self):
+    def __init__(self, profile="full"):
+        """
+        :param profile: str，解析方式，full--完整解析；fast--只解析文字，跳过图片、图表和线条，输出的文本框与full一致
+        """
+        self.profile = profile
         self.__resources_manager = PDFResourceManager()
         self.__params_manager = LAParams()
-        self.__aggregator = PDFPageAggregator(rsrcmgr=self.__resources_manager, laparams=self.__params_manager)
-        self.__interpreter = PDFPageInterpreter(rsrcmgr=self.__resources_manager, device=self.__aggregator)
-        self.__analyzer = None
 
-    def parse(self, input_path, password=""):
-        result = []
+        if self.profile == "fast":
+            self.__aggregator = TextOnlyPageAggregator(rsrcmgr=self.__resources_manager, laparams=self.__params_manager)
+            self.__interpreter = TextOnlyPageInterpreter(rsrcmgr=self.__resources_manager, device=self.__aggregator)
+        else:
+            self.__aggregator = PDFPageAggregator(rsrcmgr=self.__resources_manager, laparams=self.__params_manager)
+            self.__interpreter = PDFPageInterpreter(rsrcmgr=self.__resources_manager, device=self.__aggregator)
 
-        parser = mPDFParser(open(input_path, "rb"))
-        document = PDFDocument()
-        parser.set_document(document)
-        document.set_parser(parser)
-        document.initialize(password=password)
+        self.__analyzer = None
 
-        for page in document.get_pages():
-            self.__interpreter.process_page(page)
-            layout = self.__aggregator.get_result()
+    def parse(self, input_path, password="", workers=1, parts=None, cache=None):
+        """
+        解析pdf，返回按页面顺序排列的文本框
+        :param input_path: Union[str, bytes, BinaryIO, mmap.mmap]，pdf路径、内容、文件对象或mmap
+        :param password: str，pdf密码
+        :param workers: int，进程数，大于1时按页面范围拆分到多个进程中并行解析，结果与单进程一致
+        :param parts: List[int]，只解析报告中这些部分（从1开始）所在的页面，为None时解析全部页面
+        :param cache: ReportCache，提供时按页面内容哈希缓存每页的文本框，修订版pdf只重新解析有改动的页面
+        :return: List[Tuple[float, float, str]]，(x0, height, content)
+        """
+        if parts is not None:
+            return list(chain.from_iterable(self.iter_part_pages(input_path, password, parts, cache)))
 
-            for out in layout:
-                if hasattr(out, 'get_text'):
-                    content = out.get_text().strip()
-                    content = content.replace('\n', '|')
-                    result.append((out.x0, out.height, content))
+        if workers > 1:
+            return self._parse_in_parallel(input_path, password, workers, cache)
 
-        return result
+        return self._parse_pages(input_path, password, cache=cache)
 
     def analyze(self, rule, parse_result):
-        if rule == "Monetary Report":
-            self.__analyzer = MonetaryPolicyReportAnalyzer()
+        """
+        :param rule: Union[str, LayoutRule]，已注册的版面规则名称（见LayoutRules.register_rule）或规则本身
+        :param parse_result: Iterable[Tuple[float, float, str]]，parse的结果
+        :return: IndexNode，目录树
+        """
+        layout_rule = rule if isinstance(rule, LayoutRule) else LAYOUT_RULES.get(rule)
+
+        if layout_rule is not None:
+            self.__analyzer = MonetaryPolicyReportAnalyzer(layout_rule)
             result = self.__analyzer.analyze(parse_result)
 
         else:
             print("rule is invalid, doesn't analyze content")
-            return parse_result
+            return list(parse_result)
+
+        return result
+
+    def load(self, rule, input_path, password="", cache=None, parts=None):
+        """
+        解析并分析pdf，提供cache时优先读取缓存，命中目录树缓存时不再调用pdfminer
+        :param rule: Union[str, LayoutRule]，分析规则
+        :param input_path: Union[str, bytes, BinaryIO, mmap.mmap]，pdf路径、内容、文件对象或mmap
+        :param password: str，pdf密码
+        :param cache: ReportCache，磁盘缓存
+        :param parts: List[int]，只解析报告中这些部分所在的页面，为None时解析全部页面
+        :return: IndexNode，目录树
+        """
+        if cache is None:
+            if parts is None:
+                pages = self.iter_pages(input_path, password)
+            else:
+                pages = self.iter_part_pages(input_path, password, parts)
+
+            return self.analyze(rule, chain.from_iterable(pages))
+
+        key = cache.make_key(input_path, self.get_settings(), ANALYZER_VERSION, LAYOUT_RULES.get(rule, rule), parts)
+        index_tree = cache.get(key, "tree")
+
+        if index_tree is None:
+            parse_result = cache.get(key, "parse")
+
+            if parse_result is None:
+                parse_result = self.parse(input_path, password, parts=parts, cache=cache)
+                cache.set(key, "parse", parse_result)
+
+            index_tree = self.analyze(rule, parse_result)
+            cache.set(key, "tree", index_tree)
+
+        return index_tree
+
+    def get_settings(self):
+        settings = {"version": PARSER_VERSION, "profile": self.profile}
+        settings.update(vars(self.__params_manager))
+
+        return settings
+
+    def iter_pages(self, input_path, password="", start=0, stop=None, cache=None):
+        """
+        逐页解析pdf，每次产出一页的文本框，供分析器边解析边消费
+        :param input_path: Union[str, bytes, BinaryIO, mmap.mmap]，pdf路径、内容、文件对象或mmap
+        :param password: str，pdf密码
+        :param start: int，起始页（从0开始）
+        :param stop: int，结束页（不包含），为None时解析到最后一页
+        :param cache: ReportCache，页面级缓存
+        :return: Iterator[List[Tuple[float, float, str]]]
+        """
+        with self._open_document(input_path, password) as document:
+            load_page = self._page_loader(cache)
+
+            for page in islice(document.get_pages(), start, stop):
+                yield load_page(page)
+
+    def iter_part_pages(self, input_path, password, parts, cache=None):
+        """
+        逐页解析pdf，但只解析指定部分所在的页面。封面、目录等前置页面总是解析，从目录中读取各部分的起始页码；
+        其余部分只解析起始页，以保留其标题，使目录树中各部分的位置不变；目录中没有最后一部分的结束页，最后一部分解析到文档末尾。
+        注意：页面高度等版面统计只来自已解析的页面，表格、专栏较多的部分可能与全量解析略有差异
+        :param input_path: Union[str, bytes, BinaryIO, mmap.mmap]，pdf路径、内容、文件对象或mmap
+        :param password: str，pdf密码
+        :param parts: List[int]，需要的部分（从1开始，与目录中的顺序一致）
+        :param cache: ReportCache，页面级缓存
+        :return: Iterator[List[Tuple[float, float, str]]]
+        """
+        with self._open_document(input_path, password) as document:
+            yield from self._iter_part_pages(document, parts, self._page_loader(cache))
+
+    def _iter_part_pages(self, document, parts, load_page):
+        pages = document.get_pages()
+        toc = []
+        offset = None
+        page_no = 0
+
+        for page_no, page in enumerate(pages):
+            page_result = load_page(page)
+            yield page_result
+
+            for (_, _, content) in page_result:
+                result = re.match(TOC_PATTERN, content)
+                if result:
+                    toc.append(int(result.group(1)))
+
+            # 第一个页码为阿拉伯数字的页面即正文第一页
+            page_index = [content for (_, _, content) in page_result if content.strip()]
+            if page_index and page_index[-1].isdigit():
+                offset = page_no - int(page_index[-1]) + 1
+                break
+
+        if offset is None or not toc:
+            for page in pages:
+                yield load_page(page)
+            return
+
+        page_ranges = []
+        for ind, start in enumerate(toc):
+            if ind + 1 in parts:
+                stop = toc[ind + 1] if ind + 1 < len(toc) else None
+                page_ranges.append((start, stop))
+            else:
+                page_ranges.append((start, start))
+
+        for page_no, page in enumerate(pages, page_no + 1):
+            body_page = page_no - offset + 1
+
+            if any(start <= body_page and (stop is None or body_page <= stop) for (start, stop) in page_ranges):
+                yield load_page(page)
+
+    def page_cache_keys(self, input_path, password, cache):
+        """
+        pdf每一页在页面缓存中的键，只计算页面内容哈希，不解析版面；可传给ReportCache.invalidate删除这些页面缓存
+        :param input_path: Union[str, bytes, BinaryIO, mmap.mmap]，pdf路径、内容、文件对象或mmap
+        :param password: str，pdf密码
+        :param cache: ReportCache
+        :return: List[str]
+        """
+        settings = self.get_settings()
+        digests = {}
+
+        with self._open_document(input_path, password) as document:
+            return [cache.make_page_key(_page_digest(page, digests), settings) for page in document.get_pages()]
+
+    def _parse_pages(self, input_path, password="", start=0, stop=None, cache=None):
+        return list(chain.from_iterable(self.iter_pages(input_path, password, start, stop, cache)))
+
+    def _page_loader(self, cache):
+        if cache is None:
+            return self._parse_page
+
+        # 同一文档中字体、图片等共享对象的哈希只计算一次
+        settings = self.get_settings()
+        digests = {}
+
+        def load_page(page):
+            key = cache.make_page_key(_page_digest(page, digests), settings)
+            result = cache.get(key, "page")
+
+            if result is None:
+                result = self._parse_page(page)
+                cache.set(key, "page", result)
+
+            return result
+
+        return load_page
+
+    def _parse_page(self, page):
+        result = []
+
+        self.__interpreter.process_page(page)
+        layout = self.__aggregator.get_result()
+
+        for out in layout:
+            if hasattr(out, 'get_text'):
+                content = out.get_text().strip()
+                content = content.replace('\n', '|')
+                result.append((out.x0, out.height, content))
+
+        return result
+
+    def _parse_in_parallel(self, input_path, password, workers, cache=None):
+        # 路径由各进程自行打开，其余输入读成bytes后分发
+        if not isinstance(input_path, (str, os.PathLike, bytes)):
+            with open_source(input_path) as fp:
+                input_path = bytes(fp.read())
+
+        with self._open_document(input_path, password) as document:
+            page_count = sum(1 for _ in document.get_pages())
+
+        workers = min(workers, page_count) or 1
+        step, remainder = divmod(page_count, workers)
+        ranges = []
+        start = 0
+
+        for i in range(workers):
+            stop = start + step + (1 if i < remainder else 0)
+            ranges.append((start, stop))
+            start = stop
+
+        result = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_parse_page_range, self.profile, input_path, password, start, stop, cache)
+                       for start, stop in ranges]
+
+            for future in futures:
+                result += future.result()
 
         return result
+
+    @contextmanager
+    def _open_document(self, input_path, password=""):
+        # pdfminer在创建解析器时一次性读入全部内容，读完即可关闭输入；退出时释放解析器持有的数据
+        with open_source(input_path) as fp:
+            parser = mPDFParser(fp)
+
+        try:
+            document = PDFDocument()
+            parser.set_document(document)
+            document.set_parser(parser)
+            document.initialize(password=password)
+
+            yield document
+        finally:
+            parser.close()
+
+
+@contextmanager
+def open_source(source):
+    """
+    打开pdf输入，返回可read的二进制流
+    :param source: Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO, mmap.mmap]，
+                   路径在退出时关闭；bytes直接包装，不复制；文件对象与mmap回到开头读取全部内容（与缓存键一致），
+                   由调用方负责关闭
+    :return: BinaryIO
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fp:
+            yield fp
+
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+
+    else:
+        source.seek(0)
+        yield source
+
+
+def _parse_page_range(profile, input_path, password, start, stop, cache=None):
+    return PDFParser(profile)._parse_pages(input_path, password, start, stop, cache)
+
+
+def _page_digest(page, digests):
+    # 页面的内容哈希：页面尺寸、内容流与其引用的资源（字体、表单等），与对象编号无关
+    digest = hashlib.sha256(repr((page.mediabox, page.cropbox, page.rotate)).encode("utf-8"))
+
+    for stream in page.contents:
+        digest.update(_object_digest(stream, digests))
+    digest.update(_object_digest(page.resources, digests))
+
+    return digest.hexdigest()
+
+
+def _object_digest(obj, digests):
+    if isinstance(obj, PDFObjRef):
+        if obj.objid not in digests:
+            # 先占位，防止循环引用
+            digests[obj.objid] = b""
+            digests[obj.objid] = _object_digest(obj.resolve(), digests)
+
+        return digests[obj.objid]
+
+    if isinstance(obj, dict):
+        parts = [repr(key).encode("utf-8") + _object_digest(value, digests) for key, value in sorted(obj.items())]
+
+    elif isinstance(obj, list):
+        parts = [_object_digest(value, digests) for value in obj]
+
+    elif isinstance(obj, PDFStream):
+        parts = [_object_digest(obj.attrs, digests)]
+
+        # 图片不影响文本框，只比较其属性，不解码内容
+        if getattr(resolve1(obj.get("Subtype")), "name", None) != "Image":
+            parts.append(hashlib.sha256(obj.get_data()).digest())
+
+    else:
+        parts = [repr(obj).encode("utf-8")]
+
+    return hashlib.sha256(b"".join(parts)).digest()
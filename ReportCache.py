@@ -0,0 +1,164 @@
+import hashlib
+import mmap
+import os
+import pickle
+
+
+# 超出max_size时淘汰到max_size的这一比例，避免接近上限时每次写入都扫描目录
+EVICT_RATIO = 0.9
+
+
+class ReportCache:
+    def __init__(self, cache_dir="./.report_cache", max_size=256 * 1024 * 1024):
+        """
+        以pdf内容哈希为键的磁盘缓存，保存解析结果与分析得到的目录树，以及以页面内容哈希为键的每页文本框。
+        页面缓存只与页面内容有关，内容相同的页面在不同pdf之间共用
+        :param cache_dir: str，缓存目录
+        :param max_size: int，缓存目录的最大字节数，超出时按最近访问时间淘汰
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        # 缓存目录的字节数，第一次写入时统计，之后在内存中累加；其他进程的写入在下一次淘汰时计入
+        self.__total_size = None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, input_path, *settings):
+        """
+        生成缓存键：pdf内容哈希 + 解析/分析设置哈希
+        :param input_path: Union[str, bytes, BinaryIO, mmap.mmap]，pdf路径、内容、文件对象或mmap
+        :param settings: 参与键计算的设置，如解析器版本、LAParams、分析器版本
+        :return: str
+        """
+        return self.make_page_key(_content_digest(input_path).hexdigest(), *settings)
+
+    def make_page_key(self, page_digest, *settings):
+        """
+        生成页面级缓存键：页面内容哈希 + 解析设置哈希
+        :param page_digest: str，页面内容哈希
+        :param settings: 参与键计算的设置
+        :return: str
+        """
+        settings_digest = hashlib.sha256(repr(settings).encode("utf-8"))
+
+        return "%s.%s" % (page_digest, settings_digest.hexdigest()[:16])
+
+    def get(self, key, kind):
+        path = self._entry_path(key, kind)
+
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        # 更新访问时间供淘汰排序；读取后条目可能已被其他进程淘汰，不影响本次命中
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return value
+
+    def set(self, key, kind, value):
+        path = self._entry_path(key, kind)
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+        replaced_size = _file_size(path)
+
+        with open(temp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+        if self.__total_size is None:
+            self.__total_size = sum(size for (_, size, _) in self._entries())
+        else:
+            self.__total_size += _file_size(path) - replaced_size
+
+        if self.__total_size > self.max_size:
+            self._evict()
+
+    def invalidate(self, input_path=None, page_keys=()):
+        """
+        删除缓存
+        :param input_path: Union[str, bytes, BinaryIO, mmap.mmap]，只删除该pdf的解析结果与目录树；为None时清空缓存
+        :param page_keys: Iterable[str]，同时删除的页面缓存键，由PDFParser.page_cache_keys得到；
+                          页面缓存按内容在pdf之间共用，删除后其他包含相同页面的pdf也会重新解析这些页面
+        """
+        prefix = ""
+        if input_path is not None:
+            prefix = self.make_key(input_path).split(".")[0] + "."
+
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith(".pkl"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+        for key in page_keys:
+            try:
+                os.remove(self._entry_path(key, "page"))
+            except FileNotFoundError:
+                pass
+
+        self.__total_size = None
+
+    def _entry_path(self, key, kind):
+        return os.path.join(self.cache_dir, "%s.%s.pkl" % (key, kind))
+
+    def _entries(self):
+        entries = []
+
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"):
+                continue
+
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        return entries
+
+    def _evict(self):
+        # 重新统计整个目录（包括其他进程写入的缓存），按最近访问时间从旧到新删除
+        entries = sorted(self._entries(), reverse=True)
+        total_size = sum(size for (_, size, _) in entries)
+
+        while entries and total_size > self.max_size * EVICT_RATIO:
+            _, size, name = entries.pop()
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+        self.__total_size = total_size
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _content_digest(source):
+    digest = hashlib.sha256()
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+    elif isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        # 直接对缓冲区求哈希，不复制
+        digest.update(source)
+
+    else:
+        # 文件对象：与解析一致，从开头读取全部内容，读完后回到原位置
+        position = source.tell()
+        source.seek(0)
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            digest.update(chunk)
+        source.seek(position)
+
+    return digest
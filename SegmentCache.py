@@ -0,0 +1,113 @@
+import os
+import pickle
+from collections import OrderedDict
+
+
+class SegmentCache:
+    def __init__(self, segment, max_size=65536, path=None, fingerprint=""):
+        """
+        分词结果的LRU缓存，以句子文本为键；提供path时从磁盘读取，save时写回，可在多次运行、多组报告之间复用
+        :param segment: Callable[[str], List[str]]，分词函数，如jieba.lcut
+        :param max_size: int，最多缓存的句子数，超出时淘汰最久未使用的句子
+        :param path: str，磁盘缓存文件路径
+        :param fingerprint: str，分词词典等影响分词结果的设置，与磁盘缓存中记录的不一致时丢弃磁盘缓存
+        """
+        self.segment = segment
+        self.max_size = max_size
+        self.path = path
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        # 为True时记录新分词的句子，子进程用take_added把结果交回主进程
+        self.record_added = False
+
+        self.__entries = OrderedDict()
+        self.__added = []
+
+        if self.path is not None:
+            self.load()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def lcut(self, text):
+        """
+        :param text: str
+        :return: List[str]，分词结果
+        """
+        words = self.__entries.get(text)
+
+        if words is None:
+            self.misses += 1
+            words = tuple(self.segment(text))
+            self.__entries[text] = words
+            if self.record_added:
+                self.__added.append((text, words))
+
+            if len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self.__entries.move_to_end(text)
+
+        return list(words)
+
+    def stats(self):
+        """
+        :return: dict，命中次数、未命中次数、命中率与当前缓存的句子数
+        """
+        total = self.hits + self.misses
+
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self.__entries)}
+
+    def take_added(self):
+        """
+        :return: List[Tuple[str, Tuple[str, ...]]]，上次调用以来新分词的句子，record_added为True时才有记录
+        """
+        added, self.__added = self.__added, []
+
+        return added
+
+    def update(self, entries):
+        """
+        :param entries: Iterable[Tuple[str, Tuple[str, ...]]]，句子与分词结果，如其他进程take_added的结果
+        """
+        for text, words in entries:
+            self.__entries[text] = words
+            self.__entries.move_to_end(text)
+
+        while len(self.__entries) > self.max_size:
+            self.__entries.popitem(last=False)
+
+    def clear(self):
+        self.__entries.clear()
+        self.__added.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path=None):
+        """
+        读取磁盘缓存，与已有的缓存合并；文件不存在或fingerprint不一致时忽略
+        :param path: str，默认为self.path
+        """
+        path = path or self.path
+
+        try:
+            with open(path, "rb") as f:
+                (fingerprint, entries) = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return
+
+        if fingerprint != self.fingerprint:
+            return
+
+        self.update(entries)
+
+    def save(self, path=None):
+        path = path or self.path
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+
+        with open(temp_path, "wb") as f:
+            pickle.dump((self.fingerprint, list(self.__entries.items())), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
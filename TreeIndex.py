@@ -0,0 +1,165 @@
+import re
+
+
+SENTENCE_PATTERN = re.compile("[。？！]")
+
+
+class TreeIndex:
+    def __init__(self, tree, automaton=None):
+        """
+        目录树的地址索引，建立一次后按地址直接取节点、标题、段落与句子。
+        规范地址由"/"连接，序号从1开始：c5/c2--第5部分的第2节；c5/c2/t--其标题；c5/c2/p3--第3段；c5/c2/p3s1--第3段第1句。
+        标题去掉了序号，段落与句子去掉了句首的"是"并以句号结尾，与对比时使用的文本一致
+        :param tree: IndexNode，目录树
+        :param automaton: KeywordAutomaton，对比项用到的全部关键词；提供时每段文本只扫描一次，关键词查询都从扫描结果中得到
+        """
+        self.automaton = automaton
+        self.entries = {}
+        self.__found_keywords = {}
+        self.__children_count = {}
+        self.__sentence_count = {}
+        self.__resolved = {}
+
+        self._add_node("", tree)
+
+    def get(self, address):
+        """
+        :param address: str，规范地址
+        :return: Union[IndexNode, str, None]
+        """
+        return self.entries.get(address)
+
+    def find(self, path, keywords=None):
+        """
+        按路径查找文本，路径可以包含通配：c--所有子节点；p--所有段落；ps1--所有段落的第1句；序号可以为负数，与list下标一致
+        :param path: List[List[str]]，如[["c5"], ["c2"], ["ps1", "p1s-1"]]，每一层中的地址依次展开
+        :param keywords: List[str]，只保留包含至少10%关键词的文本
+        :return: List[str]
+        """
+        key = (tuple(tuple(route) for route in path), tuple(keywords) if keywords else None)
+        addresses = self.__resolved.get(key)
+
+        if addresses is None:
+            addresses = self._resolve(path)
+
+            if keywords:
+                addresses = [address for address in addresses
+                             if sum(1 for kw in keywords if self._contains(address, kw)) / len(keywords) >= 0.1]
+
+            self.__resolved[key] = addresses
+
+        return [self.entries[address] for address in addresses]
+
+    def _contains(self, address, keyword):
+        if self.automaton is None or keyword not in self.automaton:
+            return keyword in self.entries[address]
+
+        found = self.__found_keywords.get(address)
+        if found is None:
+            found = self.automaton.scan(self.entries[address])
+            self.__found_keywords[address] = found
+
+        return keyword in found
+
+    def _add_node(self, address, node):
+        prefix = address + "/" if address else ""
+
+        self.entries[address] = node
+        self.entries[prefix + "t"] = _strip_title(node.title) + "。"
+        self.__children_count[address] = len(node.children)
+        self.__sentence_count[address] = []
+
+        for p_ind, paragraph in enumerate(node.paragraphs, 1):
+            self.entries["%sp%d" % (prefix, p_ind)] = _strip_sentence(paragraph) + "。"
+
+            sentences = SENTENCE_PATTERN.split(paragraph)
+            self.__sentence_count[address].append(len(sentences))
+
+            for s_ind, sentence in enumerate(sentences, 1):
+                self.entries["%sp%ds%d" % (prefix, p_ind, s_ind)] = _strip_sentence(sentence) + "。"
+
+        for c_ind, child in enumerate(node.children, 1):
+            self._add_node("%sc%d" % (prefix, c_ind), child)
+
+    def _resolve(self, path):
+        addresses = [""]
+
+        for route in path:
+            expanded = []
+
+            for address in addresses:
+                # 文本没有下级地址
+                if not isinstance(self.entries[address], str):
+                    for r in route:
+                        expanded += self._expand(address, r)
+
+            addresses = expanded
+
+        return addresses
+
+    def _expand(self, address, r):
+        prefix = address + "/" if address else ""
+
+        if r.startswith("c"):
+            children = range(1, self.__children_count[address] + 1)
+            if r != "c":
+                children = _select(children, r[1:])
+
+            return ["%sc%d" % (prefix, c) for c in children]
+
+        elif r.startswith("t"):
+            return [prefix + "t"]
+
+        elif r.startswith("p"):
+            sentence_count = self.__sentence_count[address]
+            paragraphs = range(1, len(sentence_count) + 1)
+
+            if "s" in r:
+                first_s = r.index("s")
+                if r[:first_s] != "p":
+                    paragraphs = _select(paragraphs, r[1:first_s])
+
+                result = []
+                for p in paragraphs:
+                    sentences = range(1, sentence_count[p - 1] + 1)
+
+                    for number in r[first_s + 1:].split("s"):
+                        result += ["%sp%ds%d" % (prefix, p, s) for s in _select(sentences, number)]
+
+                return result
+
+            if r != "p":
+                paragraphs = _select(paragraphs, r[1:])
+
+            return ["%sp%d" % (prefix, p) for p in paragraphs]
+
+        raise ValueError("find_content")
+
+
+def _select(positions, number):
+    # 序号从1开始，与list下标规则一致：0为最后一个，负数从末尾倒数，越界时为空
+    try:
+        return [positions[int(number) - 1]]
+    except IndexError:
+        return []
+
+
+def _strip_title(title):
+    head = title[:4]
+    if "、" in head:
+        start = head.index("、") + 1
+    elif "）" in head:
+        start = head.index("）") + 1
+    elif "." in head:
+        start = head.index(".") + 1
+    else:
+        start = 0
+
+    return title[start:]
+
+
+def _strip_sentence(sentence):
+    if "是" in sentence[:3]:
+        return sentence[sentence.index("是") + 1:]
+
+    return sentence
@@ -1,103 +1,210 @@
-import jieba
-import Levenshtein as edit
+import numpy as np
+import os
 import re
+import sys
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate
+from rapidfuzz.distance import Levenshtein
+from rapidfuzz.process import cdist, cpdist
 
+from DictionarySnapshot import default_snapshot_path, dictionary_fingerprint, load_tokenizer
+from DiffResult import DiffResult, DiffSpan
+from SegmentCache import SegmentCache
 
-jieba.load_userdict("userdict.txt")
 
+USERDICT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "userdict.txt")
 
-def align_text(paragraph_a, paragraph_b, join=True):
-    sent_list_a = re.split("\\W", paragraph_a) if paragraph_a else []
-    punc_list_a = re.split("\\w", paragraph_a)[1:-1] if paragraph_a else []
-    punc_list_a = [i for i in punc_list_a if i]
-    sent_list_b = re.split("\\W", paragraph_b) if paragraph_b else []
-    punc_list_b = re.split("\\w", paragraph_b)[1:-1] if paragraph_b else []
-    punc_list_b = [i for i in punc_list_b if i]
-    alignment_sents = _align_text_list_for_paragraphs(sent_list_a, sent_list_b)
-
-    alignment_ops = []
-    for i in range(len(alignment_sents)):
-        text_a = sent_list_a[alignment_sents[i][0]] if alignment_sents[i][0] != 100 else ""
-        text_b = sent_list_b[alignment_sents[i][1]] if alignment_sents[i][1] != 100 else ""
-        alignment_ops.append((_edit_ops(text_a, text_b)))
-
-    char_ops_a, char_ops_b = [], []
-    for j in range(len(alignment_ops)):
-        if alignment_ops[j][0]:
-            char_ops_a.append((alignment_sents[j][0], alignment_ops[j][0]))
-        if alignment_ops[j][1]:
-            char_ops_b.append((alignment_sents[j][1], alignment_ops[j][1]))
-
-    char_ops_a.sort(key=lambda x: x[0])
-    char_ops_b.sort(key=lambda x: x[0])
-
-    cache_ops_a, cache_ops_b = [], []
-    for i in range(len(char_ops_a)):
-        cache_ops_a.append(char_ops_a[i][1])
-        if i < len(char_ops_a) - 1:
-            cache_ops_a.append([("equal", punc_list_a[i])])
-
-    for j in range(len(char_ops_b)):
-        cache_ops_b.append(char_ops_b[j][1])
-        if j < len(char_ops_b) - 1:
-            cache_ops_b.append([("equal", punc_list_b[j])])
+# 分词器在第一次分词时才加载；快照可用python DictionarySnapshot.py预先生成，缺失或过期时在首次分词时生成
+DICTIONARY_SNAPSHOT_PATH = default_snapshot_path(USERDICT_PATH)
 
-    ops_a, ops_b = [], []
-    for i in cache_ops_a:
-        ops_a += i
-    for j in cache_ops_b:
-        ops_b += j
+_tokenizer = None
+
+
+def _segment(text):
+    global _tokenizer
+
+    if _tokenizer is None:
+        _tokenizer = load_tokenizer(USERDICT_PATH, DICTIONARY_SNAPSHOT_PATH)
+
+    return _tokenizer.lcut(text)
+
+
+# 分词缓存：相邻两期报告的句子大多相同，同一句子只分词一次；需要跨进程复用时调用SEGMENT_CACHE.load/save
+SEGMENT_CACHE = SegmentCache(_segment, fingerprint=dictionary_fingerprint(USERDICT_PATH))
+
+# 未匹配句子的序号，排序时位于所有句子之后
+UNALIGNED = sys.maxsize
 
-    new_result = _decorate(ops_a, False).strip("。")
-    old_result = _decorate(ops_b, True).strip("。")
+# 候选句子对筛选（pruning="ngram"）的参数
+NGRAM_SIZE = 2
+NGRAM_TOP_K = 20
+NGRAM_MIN_POSTING = 32
+NGRAM_MAX_POSTING_RATIO = 0.1
+
+# 句内对比时的切词方式，切出的词按顺序连接后须与原句相同；char不需要加载词典
+TOKENIZERS = {
+    "jieba": SEGMENT_CACHE.lcut,
+    "char": list,
+}
+
+# tokenizer="ngram"时重叠n-gram的字符数
+TOKEN_NGRAM_SIZE = 2
+
+
+def register_tokenizer(name, tokenize):
+    """
+    注册新的切词方式，注册后可在align_text中按名称使用
+    :param name: str
+    :param tokenize: Callable[[str], List[str]]，切出的词按顺序连接后须与原句相同
+    """
+    TOKENIZERS[name] = tokenize
+
+
+def align_text(paragraph_a, paragraph_b, join=True, matching="greedy", pruning=None, tokenizer="jieba"):
+    """
+    对齐并对比两段文本，返回以html标注差异的结果，等价于diff_text(...).to_html(join)
+    :param paragraph_a: str，新的文本
+    :param paragraph_b: str，旧的文本
+    :param join: bool，True时返回以<br><br>分句的字符串，否则返回句子列表
+    :param matching: str，参考diff_text
+    :param pruning: str，参考diff_text
+    :param tokenizer: Union[str, Callable[[str], List[str]]]，参考diff_text
+    :return: Union[Tuple[str, str], Tuple[List[str], List[str]]]
+    """
+    return diff_text(paragraph_a, paragraph_b, matching, pruning, tokenizer).to_html(join)
+
+
+def diff_text(paragraph_a, paragraph_b, matching="greedy", pruning=None, tokenizer="jieba"):
+    """
+    对齐并对比两段文本，按标点切分为句子后两两匹配，再逐句标注差异
+    :param paragraph_a: str，新的文本
+    :param paragraph_b: str，旧的文本
+    :param matching: str，句子匹配方式，greedy--按距离从小到大贪心匹配；optimal--使距离之和最小的最优匹配
+    :param pruning: str，候选句子对筛选方式，None--计算所有句子对的距离；ngram--只计算共享字符n-gram较多的句子对，
+                    适合整份报告等大量句子的对比，结果可能与None不同
+    :param tokenizer: Union[str, Callable[[str], List[str]]]，句内对比的切词方式，jieba--jieba分词；char--逐字，
+                      不需要加载词典；ngram--对比重叠的字符n-gram序列，再映射回逐字的差异，不需要加载词典；
+                      或自定义的切词函数
+    :return: DiffResult，可渲染为html、纯文本或json
+    """
+    sent_list_a = re.split("\\W", paragraph_a) if paragraph_a else []
+    sent_list_b = re.split("\\W", paragraph_b) if paragraph_b else []
+    alignment_sents = _align_text_list_for_paragraphs(sent_list_a, sent_list_b, matching, pruning)
+    tokenize = tokenizer if not isinstance(tokenizer, str) or tokenizer == "ngram" else TOKENIZERS[tokenizer]
+
+    clause_ops_a, clause_ops_b = {}, {}
+    for (ind_a, ind_b) in alignment_sents:
+        text_a = sent_list_a[ind_a] if ind_a != UNALIGNED else ""
+        text_b = sent_list_b[ind_b] if ind_b != UNALIGNED else ""
+        ops_a, ops_b = _edit_ops(text_a, text_b, tokenize)
+
+        if ops_a:
+            clause_ops_a[ind_a] = ops_a
+        if ops_b:
+            clause_ops_b[ind_b] = ops_b
+
+    alignment = [(ind_a if ind_a != UNALIGNED else None, ind_b if ind_b != UNALIGNED else None)
+                 for (ind_a, ind_b) in alignment_sents]
+
+    return DiffResult(paragraph_a, paragraph_b, _place_spans(paragraph_a, sent_list_a, clause_ops_a),
+                      _place_spans(paragraph_b, sent_list_b, clause_ops_b), alignment)
+
+
+def diff_tokens(tokens_a, tokens_b):
+    """
+    词序列的编辑操作：词映射为整数编号后由rapidfuzz计算，词表大小不受限制
+    :param tokens_a: List[str]，新的词序列
+    :param tokens_b: List[str]，旧的词序列
+    :return: List[Tuple[str, int, int, int, int]]，(操作, b起点, b终点, a起点, a终点)，操作把tokens_b变为tokens_a，
+             操作为equal、replace、insert、delete
+    """
+    vocabulary = {}
+    ids_a = [vocabulary.setdefault(token, len(vocabulary)) for token in tokens_a]
+    ids_b = [vocabulary.setdefault(token, len(vocabulary)) for token in tokens_b]
+
+    return [tuple(op) for op in Levenshtein.opcodes(ids_b, ids_a)]
+
+
+def diff_ngrams(text_a, text_b, size=TOKEN_NGRAM_SIZE):
+    """
+    字符级的编辑操作：对比两句重叠的字符n-gram序列，相同的n-gram覆盖的字符为相同，其余字符按位置成为
+    replace、insert或delete；任一句短于size时逐字对比
+    :param text_a: str，新的文本
+    :param text_b: str，旧的文本
+    :param size: int，n-gram的字符数
+    :return: List[Tuple[str, int, int, int, int]]，与diff_tokens相同，起点、终点为字符偏移
+    """
+    if len(text_a) < size or len(text_b) < size:
+        return diff_tokens(list(text_a), list(text_b))
+
+    grams_a = [text_a[i: i + size] for i in range(len(text_a) - size + 1)]
+    grams_b = [text_b[i: i + size] for i in range(len(text_b) - size + 1)]
+
+    opcodes = []
+    a_end = b_end = 0
+
+    for (op_name, b_start, b_stop, a_start, a_stop) in diff_tokens(grams_a, grams_b):
+        if op_name != "equal":
+            continue
+
+        # 相同的n-gram块覆盖的字符向后延伸size-1个；与前一块重叠的部分两侧同时去掉，剩余字符仍一一对应
+        overlap = max(a_end - a_start, b_end - b_start, 0)
+        a_start, b_start = a_start + overlap, b_start + overlap
+        a_stop, b_stop = a_stop + size - 1, b_stop + size - 1
+        if a_start >= a_stop:
+            continue
+
+        opcodes += _gap_opcode(a_end, a_start, b_end, b_start)
+        opcodes.append(("equal", b_start, b_stop, a_start, a_stop))
+        a_end, b_end = a_stop, b_stop
+
+    return opcodes + _gap_opcode(a_end, len(text_a), b_end, len(text_b))
+
+
+def _gap_opcode(a_start, a_end, b_start, b_end):
+    if a_start < a_end and b_start < b_end:
+        return [("replace", b_start, b_end, a_start, a_end)]
+    if a_start < a_end:
+        return [("insert", b_start, b_end, a_start, a_end)]
+    if b_start < b_end:
+        return [("delete", b_start, b_end, a_start, a_end)]
+
+    return []
+
+
+def _align_text_list_for_paragraphs(list_a, list_b, matching="greedy", pruning=None):
+    first_a = [str_a.split("。")[0] for str_a in list_a]
+    first_b = [str_b.split("。")[0] for str_b in list_b]
+    # 句子中不含句号时，首句即整句，两种距离相同
+    has_first = first_a != list_a or first_b != list_b
+
+    if pruning == "ngram":
+        pairs_a, pairs_b = _candidate_pairs(list_a, list_b)
+        distances = _pair_distances(list_a, list_b, pairs_a, pairs_b)
+        if has_first:
+            distances = np.minimum(distances, _pair_distances(first_a, first_b, pairs_a, pairs_b))
 
-    if join:
-        new_result = new_result.replace("。", "<br><br>")
-        old_result = old_result.replace("。", "<br><br>")
     else:
-        new_result = new_result.split("。")
-        old_result = old_result.split("。")
-
-        new_result = [i + "。" for i in new_result]
-        old_result = [i + "。" for i in old_result]
-
-    return new_result, old_result
-
-
-def _align_text_list_for_paragraphs(list_a, list_b):
-    distances = []
-
-    for ind_a in range(len(list_a)):
-        str_a = list_a[ind_a]
-        first_a = str_a.split("。")[0]
-        for ind_b in range(len(list_b)):
-            str_b = list_b[ind_b]
-            first_b = str_b.split("。")[0]
-            try:
-                dist1 = edit.distance(str_a, str_b) / ((len(str_a) + len(str_b)) / 2)
-                dist2 = edit.distance(first_a, first_b) / ((len(first_a) + len(first_b)) / 2)
-                dist = min(dist1, dist2)
-            except ZeroDivisionError:
-                dist = 0
-            distances.append((ind_a, ind_b, dist))
-
-    alignment = _align_distances_for_paragraphs(distances, list_a, list_b)
-
-    for ind in range(len(list_a)):
-        not_in = True
-        for item in alignment:
-            if ind == item[0]:
-                not_in = False
-        if not_in:
-            alignment.append((ind, 100))
-
-    for ind in range(len(list_b)):
-        not_in = True
-        for item in alignment:
-            if ind == item[1]:
-                not_in = False
-        if not_in:
-            alignment.append((100, ind))
+        distances = _distance_matrix(list_a, list_b)
+        if has_first:
+            distances = np.minimum(distances, _distance_matrix(first_a, first_b))
+
+        pairs_a, pairs_b = np.divmod(np.arange(distances.size), max(len(list_b), 1))
+        distances = distances.ravel()
+
+    if matching == "optimal":
+        # 未进入候选的句子对不参与匹配
+        matrix = np.full((len(list_a), len(list_b)), np.inf)
+        matrix[pairs_a, pairs_b] = distances
+        alignment = _align_distances_optimally(matrix)
+    else:
+        alignment = _align_distances_for_paragraphs(pairs_a, pairs_b, distances, min(len(list_a), len(list_b)))
+
+    aligned_a = {item[0] for item in alignment}
+    aligned_b = {item[1] for item in alignment}
+    alignment += [(ind, UNALIGNED) for ind in range(len(list_a)) if ind not in aligned_a]
+    alignment += [(UNALIGNED, ind) for ind in range(len(list_b)) if ind not in aligned_b]
 
     alignment.sort(key=lambda x: x[0])
     alignment.sort(key=lambda x: x[1])
@@ -105,126 +212,252 @@ def _align_text_list_for_paragraphs(list_a, list_b):
     return alignment
 
 
-def _align_distances_for_paragraphs(distances, list_a, list_b):
+def _distance_matrix(list_a, list_b):
+    """
+    归一化编辑距离矩阵：编辑距离 / 两句平均长度，两句都为空时为0。编辑距离由rapidfuzz多线程批量计算
+    :param list_a: List[str]
+    :param list_b: List[str]
+    :return: np.ndarray，len(list_a)*len(list_b)
+    """
+    distances = cdist(list_a, list_b, scorer=Levenshtein.distance, dtype=np.int32, workers=-1)
+    lengths = (_lengths(list_a)[:, None] + _lengths(list_b)[None, :]) / 2
+
+    return _normalize(distances, lengths)
+
+
+def _pair_distances(list_a, list_b, pairs_a, pairs_b):
+    # 只计算候选句子对的归一化编辑距离
+    queries = [list_a[ind] for ind in pairs_a.tolist()]
+    choices = [list_b[ind] for ind in pairs_b.tolist()]
+    if not queries:
+        return np.empty(0)
+
+    distances = cpdist(queries, choices, scorer=Levenshtein.distance, dtype=np.int32, workers=-1)
+    lengths = (_lengths(queries) + _lengths(choices)) / 2
+
+    return _normalize(distances, lengths)
+
+
+def _candidate_pairs(list_a, list_b, size=NGRAM_SIZE, top_k=NGRAM_TOP_K):
+    """
+    用字符n-gram倒排索引筛选候选句子对：每个a句子只保留共享n-gram最多的top_k个b句子。
+    出现在过多b句子中的n-gram（如"的"所在的n-gram）区分度低，不参与计数；短于2*size的句子只与相同的短句配对
+    :param list_a: List[str]
+    :param list_b: List[str]
+    :param size: int，n-gram长度，短于size的句子整体作为一个n-gram
+    :param top_k: int
+    :return: Tuple[np.ndarray, np.ndarray]，候选句子对的a、b序号，按a、b排列
+    """
+    postings = {}
+    for ind_b, str_b in enumerate(list_b):
+        for gram in _ngrams(str_b, size):
+            postings.setdefault(gram, []).append(ind_b)
+
+    max_posting = max(NGRAM_MIN_POSTING, len(list_b) * NGRAM_MAX_POSTING_RATIO)
+    short_b = {}
+    for ind_b, str_b in enumerate(list_b):
+        if len(str_b) < 2 * size:
+            short_b.setdefault(str_b, []).append(ind_b)
+
+    pairs_a, pairs_b = [], []
+
+    for ind_a, str_a in enumerate(list_a):
+        # 短句（如被标点切开的数字）n-gram太少，只与相同的短句配对，取相对位置最近的top_k个
+        if len(str_a) < 2 * size:
+            same = short_b.get(str_a, [])
+            start = bisect_left(same, ind_a * len(list_b) / max(len(list_a), 1)) - top_k // 2
+            start = min(max(start, 0), max(len(same) - top_k, 0))
+            candidates = same[start: start + top_k]
+        else:
+            shared = Counter()
+            for gram in _ngrams(str_a, size):
+                posting = postings.get(gram)
+                if posting is not None and len(posting) <= max_posting:
+                    shared.update(posting)
+
+            candidates = sorted(ind_b for (ind_b, _) in shared.most_common(top_k))
+
+        pairs_a += [ind_a] * len(candidates)
+        pairs_b += candidates
+
+    return np.array(pairs_a, dtype=np.int64), np.array(pairs_b, dtype=np.int64)
+
+
+def _ngrams(text, size):
+    if len(text) < size:
+        return {text}
+
+    return {text[i: i + size] for i in range(len(text) - size + 1)}
+
+
+def _lengths(texts):
+    return np.fromiter(map(len, texts), dtype=np.float64, count=len(texts))
+
+
+def _normalize(distances, lengths):
+    distances = distances.astype(np.float64)
+
+    return np.divide(distances, lengths, out=np.zeros_like(distances), where=lengths > 0)
+
+
+def _align_distances_for_paragraphs(pairs_a, pairs_b, distances, pair_count):
+    # 贪心匹配：按距离从小到大（距离相同时按序号）依次取两边都未匹配的句子，距离超过1时视为都未匹配
     alignment = []
-    alignment_cache = []
+    used_a, used_b = set(), set()
+    order = np.lexsort((pairs_b, pairs_a, distances))
 
-    if not distances:
-        return alignment
+    for (ind_a, ind_b, dist) in zip(pairs_a[order].tolist(), pairs_b[order].tolist(), distances[order].tolist()):
+        if len(used_a) == pair_count:
+            break
 
-    distances.sort(key=lambda x: x[-1])
-    aligned = distances[0]
-    ind_a = aligned[0]
-    ind_b = aligned[1]
+        if ind_a in used_a or ind_b in used_b:
+            continue
 
-    alignment_cache.append((ind_a, ind_b, aligned[-1]))
-    distances = [item for item in distances if item[0] != ind_a and item[1] != ind_b]
-    alignment_cache = alignment_cache + _align_distances_for_paragraphs(distances, list_a, list_b)
+        used_a.add(ind_a)
+        used_b.add(ind_b)
 
-    for item in alignment_cache:
-        if len(item) == 2:
-            alignment.append(item)
-        elif item[-1] <= 1:
-            alignment.append((item[0], item[1]))
+        if dist <= 1:
+            alignment.append((ind_a, ind_b))
         else:
-            alignment.append((item[0], 100))
-            alignment.append((100, item[1]))
+            alignment.append((ind_a, UNALIGNED))
+            alignment.append((UNALIGNED, ind_b))
 
     return alignment
 
 
-def _edit_ops(text_a, text_b):
-    ops_a, ops_b = [], []
+def _align_distances_optimally(distances):
+    # 最优匹配：使匹配句子的距离之和最小；距离超过1的句子对按1计，匹配后仍视为都未匹配
+    alignment = []
+    count_a, count_b = distances.shape
 
-    if not text_a and not text_b:
-        return ops_a, ops_b
+    if not distances.size:
+        return alignment
 
-    if text_a and not text_b:
-        ops_a.append(("insert", text_a))
+    cost = np.minimum(distances, 1)
+    rows = _linear_sum_assignment(cost if count_a <= count_b else cost.T)
+    pairs = enumerate(rows) if count_a <= count_b else ((ind_a, ind_b) for (ind_b, ind_a) in enumerate(rows))
 
-        return ops_a, ops_b
+    for (ind_a, ind_b) in sorted(pairs):
+        if distances[ind_a, ind_b] <= 1:
+            alignment.append((ind_a, ind_b))
+        else:
+            alignment.append((ind_a, UNALIGNED))
+            alignment.append((UNALIGNED, ind_b))
 
-    if not text_a and text_b:
-        ops_b.append(("delete", text_b))
+    return alignment
 
-        return ops_a, ops_b
 
-    mapper = iter("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ")
+def _linear_sum_assignment(cost):
+    """
+    匈牙利算法（最短增广路），行数不多于列数，每行分配一个不同的列，使代价之和最小
+    :param cost: np.ndarray，n*m的代价矩阵，n<=m
+    :return: List[int]，每行分配到的列
+    """
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
 
-    split_a = jieba.lcut(text_a)
-    split_b = jieba.lcut(text_b)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        min_v = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
 
-    word_set = set(split_a + split_b)
-    word_dict = {}
-    word_dict_rev = {}
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
 
-    for i in word_set:
-        if i not in word_dict:
-            j = mapper.__next__()
-            word_dict[i] = j
-            word_dict_rev[j] = i
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            update = free & (cur < min_v[1:])
+            min_v[1:][update] = cur[update]
+            way[1:][update] = j0
 
-    text_a = ""
-    for tk in split_a:
-        text_a += word_dict[tk]
+            candidates = np.where(free, min_v[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
 
-    text_b = ""
-    for tk in split_b:
-        text_b += word_dict[tk]
+            u[p[used]] += delta
+            v[used] -= delta
+            min_v[1:][free] -= delta
 
-    ops = edit.opcodes(text_b, text_a)
-    for op in ops:
-        op_name = op[0]
-        cache_a = text_a[op[3]: op[4]]
-        cache_b = text_b[op[1]: op[2]]
+            j0 = j1
+            if p[j0] == 0:
+                break
 
-        slice_a = ""
-        for tk in cache_a:
-            slice_a += word_dict_rev[tk]
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
 
-        slice_b = ""
-        for tk in cache_b:
-            slice_b += word_dict_rev[tk]
+    rows = [0] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            rows[p[j] - 1] = j - 1
 
-        if _is_numerical(slice_a) and _is_numerical(slice_b):
-            op_name = "equal"
+    return rows
 
-        if slice_a:
-            ops_a.append((op_name, slice_a))
-        if slice_b:
-            ops_b.append((op_name, slice_b))
 
-    return ops_a, ops_b
+def _place_spans(paragraph, sent_list, clause_ops):
+    # 句子按序号排列，相邻句子之间插入原文中的标点；句子之间以单个非单词字符分隔，偏移量可以直接累加
+    offsets = list(accumulate((len(sent) + 1 for sent in sent_list), initial=0))
+    spans = []
+    previous_end = None
 
+    for ind in sorted(clause_ops):
+        if previous_end is not None:
+            spans.append(DiffSpan("equal", paragraph[previous_end: offsets[ind]], previous_end, offsets[ind]))
 
-def _decorate(ops, source, delete_color="#4169E1", insert_color="#FF69B4"):
-    string = ""
-    for op in ops:
-        name = op[0]
-        text = op[1]
+        for (op_name, text, start, end) in clause_ops[ind]:
+            spans.append(DiffSpan(op_name, text, offsets[ind] + start, offsets[ind] + end, ind))
 
-        if name == "equal":
-            string += text
+        previous_end = offsets[ind] + len(sent_list[ind])
 
-        elif name == "replace":
-            if source:
-                text = ("<font color=%s><s>" % delete_color) + text + "</s></font>"
-            else:
-                text = ("<font color=%s>" % insert_color) + text + "</font>"
-            string += text
+    return spans
 
-        elif name == "delete":
-            text = ("<font color=%s><s>" % delete_color) + text + "</s></font>"
-            string += text
 
-        elif name == "insert":
-            text = ("<font color=%s>" % insert_color) + text + "</font>"
-            string += text
+def _edit_ops(text_a, text_b, tokenize=SEGMENT_CACHE.lcut):
+    # 返回两句各自的(操作, 文本, 句内起点, 句内终点)；tokenize为"ngram"时由diff_ngrams给出逐字的编辑操作
+    ops_a, ops_b = [], []
 
-        else:
-            string += text
+    if not text_a and not text_b:
+        return ops_a, ops_b
 
-    return string
+    if text_a and not text_b:
+        ops_a.append(("insert", text_a, 0, len(text_a)))
+
+        return ops_a, ops_b
+
+    if not text_a and text_b:
+        ops_b.append(("delete", text_b, 0, len(text_b)))
+
+        return ops_a, ops_b
+
+    if tokenize == "ngram":
+        split_a, split_b = list(text_a), list(text_b)
+        opcodes = diff_ngrams(text_a, text_b)
+    else:
+        split_a, split_b = tokenize(text_a), tokenize(text_b)
+        opcodes = diff_tokens(split_a, split_b)
+
+    offsets_a = list(accumulate(map(len, split_a), initial=0))
+    offsets_b = list(accumulate(map(len, split_b), initial=0))
+
+    for (op_name, b_start, b_end, a_start, a_end) in opcodes:
+        slice_a = "".join(split_a[a_start: a_end])
+        slice_b = "".join(split_b[b_start: b_end])
+
+        if _is_numerical(slice_a) and _is_numerical(slice_b):
+            op_name = "equal"
+
+        if slice_a:
+            ops_a.append((op_name, slice_a, offsets_a[a_start], offsets_a[a_end]))
+        if slice_b:
+            ops_b.append((op_name, slice_b, offsets_b[b_start], offsets_b[b_end]))
+
+    return ops_a, ops_b
 
 
 def _is_numerical(text):
@@ -0,0 +1,271 @@
+import argparse
+import cProfile
+import copy
+import json
+import os
+import platform
+import pstats
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import Comparer
+from Analyzer import MonetaryPolicyReportAnalyzer
+from Comparer import MonetaryReportComparer, MonetaryCommitteeComparer
+from LayoutBoxes import LayoutBoxes
+from PDFParser import PDFParser
+from alignment_methods import align_text, diff_text, SEGMENT_CACHE, TOKENIZERS
+
+
+REPORTS = ["2019Q3.pdf", "2019Q4.pdf", "2020Q1.pdf", "2020Q2.pdf", "2020Q3.pdf"]
+COMMITTEE_REPORTS = ["2021Q3Committee.txt", "2021Q4Committee.txt"]
+# 测量对齐进程数扩展性时对比的两期报告：(新报告, 旧报告)
+SCALING_PAIR = ("2020Q3.pdf", "2020Q2.pdf")
+
+# MonetaryPolicyReportAnalyzer.analyze的各个阶段：(阶段名, 调用方式)
+ANALYZE_STAGES = [
+    ("divide_to_pages", lambda analyzer, state: state.update(pages=analyzer.divide_to_pages(state["parse_result"]))),
+    ("get_pdf_name", lambda analyzer, state: setattr(analyzer, "pdf_name", analyzer.get_pdf_name(state["pages"]))),
+    ("build_boxes", lambda analyzer, state: state.update(boxes=LayoutBoxes.from_pages(state["pages"]))),
+    ("get_most_height", lambda analyzer, state: setattr(analyzer, "most_height", analyzer.get_most_height(state["boxes"]))),
+    ("delete_non_text_part", lambda analyzer, state: state.update(boxes=analyzer.delete_non_text_part(state["boxes"]))),
+    ("get_most_x0", lambda analyzer, state: setattr(analyzer, "most_x0", analyzer.get_most_x0(state["boxes"]))),
+    ("merge_continuous_paragraph", lambda analyzer, state: state.update(boxes=analyzer.merge_continuous_paragraph(state["boxes"]))),
+    ("concat_pages_to_plain_text", lambda analyzer, state: state.update(paragraphs=analyzer.concat_pages_to_plain_text(state["boxes"]))),
+    ("convert_to_tree", lambda analyzer, state: state.update(tree=analyzer.convert_to_tree(state["paragraphs"]))),
+]
+
+
+def measure(stage, name, func, setup=None, repeat=3, profile=True):
+    """
+    测量一个阶段：repeat次计时取最小值与中位数，另外各运行一次统计内存峰值（tracemalloc）与函数调用次数（cProfile），
+    避免测量开销影响计时
+    :param stage: str，阶段名
+    :param name: str，输入名
+    :param func: Callable，被测函数，参数为setup的返回值
+    :param setup: Callable，每次运行前调用，返回func的参数，不计入时间
+    :param repeat: int，计时次数
+    :param profile: bool，是否统计函数调用次数
+    :return: Tuple[dict, Any]，测量结果与func最后一次的返回值
+    """
+    setup = setup or (lambda: ())
+    record = {"stage": stage, "input": name}
+    times = []
+    result = None
+
+    try:
+        for _ in range(repeat):
+            args = setup()
+            start = time.perf_counter()
+            result = func(*args)
+            times.append(time.perf_counter() - start)
+
+        args = setup()
+        tracemalloc.start()
+        func(*args)
+        record["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        if profile:
+            args = setup()
+            profiler = cProfile.Profile()
+            profiler.runcall(func, *args)
+            record["calls"] = pstats.Stats(profiler).total_calls
+
+    except Exception as e:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        record["error"] = repr(e)
+        return record, None
+
+    record["wall_time"] = {"min": min(times), "median": statistics.median(times), "runs": times}
+
+    return record, result
+
+
+def bench_reports(resources, repeat, profile):
+    records = []
+    trees = {}
+
+    for report in REPORTS:
+        path = os.path.join(resources, report)
+        record, parse_result = measure("parse", report, lambda: PDFParser().parse(path), repeat=repeat, profile=profile)
+        records.append(record)
+
+        if parse_result is None:
+            continue
+
+        state = {"parse_result": parse_result}
+        analyzer = MonetaryPolicyReportAnalyzer()
+
+        for (stage, step) in ANALYZE_STAGES:
+            # 各阶段会原地修改页面，每次运行前复制上一阶段的输出
+            record, output = measure("analyze." + stage, report, lambda a, s: (step(a, s), (a, s))[1],
+                                     lambda: copy.deepcopy((analyzer, state)), repeat=repeat, profile=profile)
+            records.append(record)
+
+            if output is None:
+                break
+
+            analyzer, state = output
+
+        else:
+            trees[report] = state["tree"]
+
+    names = [report for report in REPORTS if report in trees]
+    for (new, old) in zip(names[1:], names[:-1]):
+        comparer = MonetaryReportComparer()
+        comparer.report = [trees[new], trees[old]]
+        pair = "%s_%s" % (new, old)
+
+        inputs = _record_align_text_inputs(comparer)
+        characters = sum(len(args[0]) + len(args[1]) for args in inputs)
+
+        for tokenizer in list(TOKENIZERS) + ["ngram"]:
+            # 每次运行前清空分词缓存，各切词方式的吞吐量在相同条件下比较
+            record, _ = measure("align_text", pair, lambda: [align_text(*args, tokenizer=tokenizer) for args in inputs],
+                                lambda: SEGMENT_CACHE.clear() or (), repeat=repeat, profile=profile)
+            record["tokenizer"] = tokenizer
+            record["align_text_calls"] = len(inputs)
+            if "wall_time" in record:
+                record["characters_per_second"] = characters / record["wall_time"]["min"]
+            if tokenizer == "jieba":
+                record["segment_cache"] = SEGMENT_CACHE.stats()
+            records.append(record)
+
+        # 对齐在setup中完成一次，只测量由对比结果渲染并写入html的时间
+        output_path = os.path.join(tempfile.gettempdir(), "benchmark_%s.html" % pair)
+        sections = comparer._compare_sections()
+        record, _ = measure("render_html", pair, lambda s: comparer._to_html(output_path, s), lambda: (sections,),
+                            repeat=repeat, profile=profile)
+        records.append(record)
+
+    return records
+
+
+def bench_committee(resources, repeat, profile):
+    records = []
+    reports = []
+
+    for report in COMMITTEE_REPORTS:
+        with open(os.path.join(resources, report), encoding="utf-8") as f:
+            reports.append(f.readlines())
+
+    for (report, lines) in zip(COMMITTEE_REPORTS, reports):
+        comparer = MonetaryCommitteeComparer()
+        record, _ = measure("committee.tagging", report, comparer._tagging, lambda: (comparer._preprocess(lines),),
+                            repeat=repeat, profile=profile)
+        records.append(record)
+
+    comparer = MonetaryCommitteeComparer()
+    comparer._load_report(reports[-1], reports[0])
+    pair = "%s_%s" % (COMMITTEE_REPORTS[-1], COMMITTEE_REPORTS[0])
+    output_path = os.path.join(tempfile.gettempdir(), "benchmark_%s.html" % pair)
+    # 例会对比在写html时逐项对齐，这一阶段包含对齐与渲染
+    record, _ = measure("committee.align_render_html", pair, lambda: comparer._to_html(output_path),
+                        repeat=repeat, profile=profile)
+    records.append(record)
+
+    return records
+
+
+def bench_align_workers(resources, repeat, worker_counts):
+    """
+    对同一对报告，按不同的align_workers测量各对比项的对齐耗时（含进程池启动），speedup相对于worker_counts的第一项；
+    子进程中的调用不能被cProfile统计，这里不统计调用次数
+    :param worker_counts: List[int]，进程数
+    """
+    records = []
+    trees = [Comparer._load_monetary_report(os.path.join(resources, report)) for report in SCALING_PAIR]
+    pair = "%s_%s" % SCALING_PAIR
+    baseline = None
+
+    # 先在当前进程中对齐一次，加载分词器，子进程由fork继承，各进程数都不计入加载时间
+    warmup = MonetaryReportComparer()
+    warmup.report = trees
+    warmup._compare_sections()
+
+    for workers in worker_counts:
+        comparer = MonetaryReportComparer(align_workers=workers)
+        comparer.report = trees
+        # 每次运行前清空分词缓存，避免后面的进程数受益于前面运行积累的分词结果
+        record, _ = measure("align_sections", pair, comparer._compare_sections, lambda: SEGMENT_CACHE.clear() or (),
+                            repeat=repeat, profile=False)
+        record["align_workers"] = comparer.align_workers
+        if "wall_time" in record:
+            baseline = baseline or record["wall_time"]["min"]
+            record["speedup"] = baseline / record["wall_time"]["min"]
+        records.append(record)
+
+    return records
+
+
+def _record_align_text_inputs(comparer):
+    # 运行一次对比，记录diff_text的全部输入，计时时以align_text重放这些调用（对比并渲染为html）
+    inputs = []
+
+    def recorder(*args, **kwargs):
+        inputs.append(args)
+        return diff_text(*args, **kwargs)
+
+    Comparer.diff_text = recorder
+    try:
+        comparer._to_stdout()
+    finally:
+        Comparer.diff_text = diff_text
+
+    return inputs
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="按阶段测量解析、分析、对齐与渲染的耗时、内存峰值和调用次数，输出JSON")
+    arg_parser.add_argument("--resources", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "Resources"))
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--no-profile", action="store_true", help="不统计函数调用次数")
+    arg_parser.add_argument("--only", choices=["reports", "committee", "scaling"])
+    arg_parser.add_argument("--align-workers", default="1,2,4",
+                            help="测量对齐扩展性时的进程数，逗号分隔，默认为1,2,4")
+    arg_parser.add_argument("--output", help="结果文件路径，默认输出到stdout")
+    args = arg_parser.parse_args()
+
+    records = []
+    if args.only in (None, "reports"):
+        records += bench_reports(args.resources, args.repeat, not args.no_profile)
+    if args.only in (None, "committee"):
+        records += bench_committee(args.resources, args.repeat, not args.no_profile)
+    if args.only in (None, "scaling"):
+        worker_counts = [int(count) for count in args.align_workers.split(",")]
+        records += bench_align_workers(args.resources, args.repeat, worker_counts)
+
+    result = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": records,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
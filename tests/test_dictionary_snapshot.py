@@ -0,0 +1,92 @@
+import os
+
+import jieba
+import pytest
+
+from DictionarySnapshot import SnapshotDictionary, build_snapshot, default_snapshot_path, load_tokenizer
+from alignment_methods import USERDICT_PATH
+
+
+RESOURCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Resources")
+
+
+@pytest.fixture(scope="module")
+def snapshot_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("snapshot") / "userdict.snapshot")
+    build_snapshot(path, USERDICT_PATH)
+
+    return path
+
+
+@pytest.fixture(scope="module")
+def stock_tokenizer():
+    tokenizer = jieba.Tokenizer()
+    tokenizer.load_userdict(USERDICT_PATH)
+
+    return tokenizer
+
+
+def _report_lines():
+    lines = []
+    for name in ("2021Q3Committee.txt", "2021Q4Committee.txt"):
+        with open(os.path.join(RESOURCES, name), encoding="utf-8") as f:
+            lines += [line.strip() for line in f if line.strip()]
+
+    return lines
+
+
+def test_segmentation_matches_jieba(snapshot_path, stock_tokenizer):
+    tokenizer = load_tokenizer(USERDICT_PATH, snapshot_path)
+    assert isinstance(tokenizer.FREQ, SnapshotDictionary)
+
+    for line in _report_lines():
+        assert tokenizer.lcut(line) == stock_tokenizer.lcut(line)
+        assert tokenizer.lcut(line, HMM=False) == stock_tokenizer.lcut(line, HMM=False)
+
+
+def test_dictionary_matches_jieba(snapshot_path, stock_tokenizer):
+    dictionary = SnapshotDictionary(snapshot_path)
+
+    assert dictionary.total == stock_tokenizer.total
+    assert len(dictionary) == len(stock_tokenizer.FREQ)
+    assert dict(dictionary.items()) == stock_tokenizer.FREQ
+
+
+def test_bounded_lookup_cache(snapshot_path, stock_tokenizer):
+    # 缓存只有一条时，反复淘汰后查询结果不变
+    dictionary = SnapshotDictionary(snapshot_path, lookup_cache_size=1)
+    words = list(stock_tokenizer.FREQ)[:1000] + ["不存在的词%d" % i for i in range(100)]
+
+    for _ in range(2):
+        for word in words:
+            assert dictionary.get(word) == stock_tokenizer.FREQ.get(word)
+
+
+def test_add_word(snapshot_path, stock_tokenizer):
+    # add_word同时以词频0加入词典中没有的前缀
+    tokenizer = load_tokenizer(USERDICT_PATH, snapshot_path)
+    word = "稳中有降测试词"
+    new_words = [word[:i] for i in range(1, len(word) + 1) if word[:i] not in stock_tokenizer.FREQ]
+    count = len(tokenizer.FREQ)
+    tokenizer.add_word(word, 10)
+
+    assert tokenizer.FREQ[word] == 10
+    assert tokenizer.FREQ[word[:-1]] == 0
+    assert set(new_words) <= set(tokenizer.FREQ)
+    assert len(tokenizer.FREQ) == count + len(new_words)
+    assert "稳中有降测试词" in tokenizer.lcut("贷款利率稳中有降测试词")
+
+
+def test_rebuild_when_stale(tmp_path, stock_tokenizer):
+    # 快照与用户词典不一致（或不是快照文件）时重新生成
+    path = str(tmp_path / "userdict.snapshot")
+    with open(path, "wb") as f:
+        f.write(b"not a snapshot")
+
+    line = _report_lines()[0]
+    assert load_tokenizer(USERDICT_PATH, path).lcut(line) == stock_tokenizer.lcut(line)
+    assert isinstance(load_tokenizer(USERDICT_PATH, path).FREQ, SnapshotDictionary)
+
+
+def test_default_snapshot_path():
+    assert default_snapshot_path(USERDICT_PATH) == os.path.join(os.path.dirname(USERDICT_PATH), "userdict.snapshot")
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from alignment_methods import diff_ngrams, diff_text
+
+
+def _check_opcodes(text_a, text_b, opcodes):
+    # 编辑操作依次覆盖两句的全部字符，相同的部分字符一致
+    a_end = b_end = 0
+    for (op_name, b_start, b_stop, a_start, a_stop) in opcodes:
+        assert (a_start, b_start) == (a_end, b_end)
+        if op_name == "equal":
+            assert text_a[a_start: a_stop] == text_b[b_start: b_stop]
+        a_end, b_end = a_stop, b_stop
+
+    assert (a_end, b_end) == (len(text_a), len(text_b))
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_opcodes_cover_both_texts(seed):
+    rng = random.Random(seed)
+    text_b = "".join(rng.choice("abc") for _ in range(rng.randint(0, 20)))
+    text_a = list(text_b)
+    for _ in range(rng.randint(0, 4)):
+        position = rng.randint(0, len(text_a))
+        text_a[position: position + rng.randint(0, 2)] = rng.choice("abcd") * rng.randint(0, 3)
+    text_a = "".join(text_a)
+
+    for size in (2, 3):
+        _check_opcodes(text_a, text_b, diff_ngrams(text_a, text_b, size))
+
+
+def test_odd_length_insertion_stays_in_sync():
+    # 插入奇数个字后，后面相同的文本仍标注为相同
+    assert diff_ngrams("稳健的货币政策要更加灵活适度", "稳健的货币政策要灵活适度") == [
+        ("equal", 0, 8, 0, 8), ("insert", 8, 8, 8, 10), ("equal", 8, 12, 10, 14)]
+    assert diff_ngrams("保持流动性合理充裕", "保持流动性充裕") == [
+        ("equal", 0, 5, 0, 5), ("insert", 5, 5, 5, 7), ("equal", 5, 7, 7, 9)]
+
+
+def test_diff_text():
+    result = diff_text("今年经济稳步增长。", "去年经济平稳增长。", tokenizer="ngram")
+
+    assert result.to_text() == ("{+今+}年经济{+稳步+}增长", "[-去-]年经济[-平稳-]增长")
+    assert diff_text("增长", "增长", tokenizer="ngram").to_text() == ("增长", "增长")
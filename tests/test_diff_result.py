@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from DiffResult import DiffResult, DiffSpan
+from alignment_methods import diff_text
+
+
+RESOURCES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Resources")
+
+NEW_TEXT = "今年经济稳步增长，物价稳定。就业保持稳定。"
+OLD_TEXT = "去年经济平稳增长，物价基本稳定。"
+
+
+def _committee_pairs():
+    reports = []
+    for name in ("2021Q4Committee.txt", "2021Q3Committee.txt"):
+        with open(os.path.join(RESOURCES, name), encoding="utf-8") as f:
+            reports.append([line.strip() for line in f if line.strip()])
+
+    return list(zip(*reports))
+
+
+def _assert_same(result, restored):
+    assert restored.text_a == result.text_a
+    assert restored.text_b == result.text_b
+    assert restored.spans_a == result.spans_a
+    assert restored.spans_b == result.spans_b
+    assert restored.alignment == result.alignment
+
+
+@pytest.mark.parametrize("tokenizer", ["jieba", "char"])
+def test_json_round_trip(tokenizer):
+    for (new_text, old_text) in [(NEW_TEXT, OLD_TEXT), ("", OLD_TEXT), (NEW_TEXT, "")] + _committee_pairs():
+        result = diff_text(new_text, old_text, tokenizer=tokenizer)
+        restored = DiffResult.from_json(result.to_json())
+
+        _assert_same(result, restored)
+        assert restored.to_html() == result.to_html()
+        assert restored.to_html(join=False) == result.to_html(join=False)
+        assert restored.to_text() == result.to_text()
+
+
+def test_to_html_jieba():
+    result = diff_text(NEW_TEXT, OLD_TEXT)
+
+    assert result.to_html() == (
+        "<font color=#FF69B4>今年</font>经济<font color=#FF69B4>稳步增长</font>，物价稳定<br><br>"
+        "<font color=#FF69B4>就业保持稳定</font>",
+        "<font color=#4169E1><s>去年</s></font>经济<font color=#4169E1><s>平稳</s></font>"
+        "<font color=#4169E1><s>增长</s></font>，物价<font color=#4169E1><s>基本</s></font>稳定")
+    assert result.to_text() == ("{+今年+}经济{+稳步增长+}，物价稳定。{+就业保持稳定+}",
+                                "[-去年-]经济[-平稳-][-增长-]，物价[-基本-]稳定")
+    assert result.alignment == [(0, 0), (1, 1), (3, 2), (2, None)]
+
+
+def test_to_html_char():
+    result = diff_text(NEW_TEXT, OLD_TEXT, tokenizer="char")
+
+    assert result.to_html(join=False) == (
+        ["<font color=#FF69B4>今</font>年经济<font color=#FF69B4>稳步</font>增长，物价稳定。",
+         "<font color=#FF69B4>就业保持稳定</font>。"],
+        ["<font color=#4169E1><s>去</s></font>年经济<font color=#4169E1><s>平稳</s></font>增长，物价"
+         "<font color=#4169E1><s>基本</s></font>稳定。"])
+    assert result.to_html(delete_color="red", insert_color="green")[0].startswith("<font color=green>今</font>")
+
+
+def test_from_dict():
+    data = {"new": {"text": "稳健的货币政策", "spans": [["insert", 0, 2, 0], ["equal", 2, 7, 0]]},
+            "old": {"text": "的货币政策", "spans": [["equal", 0, 5, 0]]},
+            "alignment": [[0, 0]]}
+    result = DiffResult.from_dict(data)
+
+    assert result.spans_a == [DiffSpan("insert", "稳健", 0, 2, 0), DiffSpan("equal", "的货币政策", 2, 7, 0)]
+    assert result.alignment == [(0, 0)]
+    assert result.to_dict() == data
+    assert result.to_html() == ("<font color=#FF69B4>稳健</font>的货币政策", "的货币政策")
@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from Comparer import MONETARY_REPORT_KEYWORDS
+from KeywordAutomaton import KeywordAutomaton
+
+
+def _naive_scan(keywords, text):
+    return frozenset(kw for kw in keywords if kw and kw in text)
+
+
+def test_report_keywords():
+    automaton = MONETARY_REPORT_KEYWORDS
+    text = "保持流动性合理充裕，不搞大水漫灌，发挥再贷款、再贴现和宏观审慎评估的作用，坚持房子是用来住的、不是用来炒的定位"
+
+    assert automaton.scan(text) == _naive_scan(automaton.keywords, text)
+    assert automaton.scan(text) >= {"流动性", "大水漫灌", "再贷款", "再贴现", "宏观审慎", "房子"}
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_against_naive(seed):
+    # 小字母表使关键词之间大量互为前缀、后缀，覆盖失败指针与输出合并
+    rng = random.Random(seed)
+    keywords = ["".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 12))]
+    automaton = KeywordAutomaton(keywords)
+
+    for _ in range(20):
+        text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 30)))
+        assert automaton.scan(text) == _naive_scan(keywords, text)
+
+
+def test_empty():
+    assert KeywordAutomaton([]).scan("流动性") == frozenset()
+    assert KeywordAutomaton(["", "流动性"]).keywords == {"流动性"}
+    assert KeywordAutomaton(["流动性"]).scan("") == frozenset()
+    assert "流动性" in KeywordAutomaton(["流动性"])
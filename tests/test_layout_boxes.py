@@ -0,0 +1,38 @@
+import numpy as np
+
+from LayoutBoxes import LayoutBoxes
+
+
+BOXES = LayoutBoxes([90.0, 72.0, 72.5, 72.0, 108.0, 71.0], [12.0, 12.0, 12.0, 14.0, 12.0, 12.0],
+                    [0, 0, 0, 1, 1, 1], ["一、", "正文", "续行", "正文", "（一）", "续行"], ["1", "2"])
+
+
+def test_mode():
+    assert BOXES.mode("x0") == 72.0
+    assert BOXES.mode("height") == 12.0
+
+
+def test_histogram():
+    counts, edges = BOXES.histogram("x0", bins=[60, 80, 100, 120])
+
+    assert counts.tolist() == [4, 1, 1]
+    assert edges.tolist() == [60, 80, 100, 120]
+
+
+def test_cluster():
+    assert BOXES.cluster("x0", 1) == [(71.875, 4), (90.0, 1), (108.0, 1)]
+    assert BOXES.cluster("x0", 0.1)[0] == (72.0, 2)
+    assert LayoutBoxes().cluster("x0", 1) == []
+
+
+def test_within():
+    assert BOXES.within("x0", 72.0, 5).tolist() == [False, True, True, True, False, True]
+    assert not LayoutBoxes().within("x0", 72.0, 5).size
+
+
+def test_select_and_merge():
+    merged = BOXES.merge(~BOXES.within("x0", 72.0, 5) | np.array([False, False, False, True, False, False]))
+
+    assert merged.content == ["一、正文续行", "正文", "（一）续行"]
+    assert merged.page_ranges() == [("1", 0, 1), ("2", 1, 3)]
+    assert BOXES.select(BOXES.height > 12).content == ["正文"]
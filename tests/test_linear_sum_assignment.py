@@ -0,0 +1,39 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from alignment_methods import _align_distances_optimally, _linear_sum_assignment, UNALIGNED
+
+
+def _brute_force(cost):
+    n, m = cost.shape
+    return min(sum(cost[i, j] for i, j in enumerate(columns)) for columns in itertools.permutations(range(m), n))
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_against_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 6))
+    m = int(rng.integers(n, 7))
+    # 一半用取值很少的整数矩阵，制造大量代价相同的分配
+    cost = rng.integers(0, 3, (n, m)).astype(float) if seed % 2 else rng.random((n, m))
+
+    columns = _linear_sum_assignment(cost)
+
+    assert len(columns) == n
+    assert len(set(columns)) == n
+    assert all(0 <= j < m for j in columns)
+    assert sum(cost[i, j] for i, j in enumerate(columns)) == pytest.approx(_brute_force(cost))
+
+
+def test_align_distances_optimally():
+    # 贪心会先匹配(0, 0)，最优匹配为(0, 1)、(1, 0)；距离超过1的句子对匹配后仍视为未匹配
+    distances = np.array([[0.1, 0.2],
+                          [0.3, 5.0],
+                          [2.0, 3.0]])
+
+    assert _align_distances_optimally(distances) == [(0, 1), (1, 0)]
+    assert _align_distances_optimally(distances.T) == [(0, 1), (1, 0)]
+    assert _align_distances_optimally(np.array([[2.0]])) == [(0, UNALIGNED), (UNALIGNED, 0)]
+    assert _align_distances_optimally(np.zeros((0, 3))) == []